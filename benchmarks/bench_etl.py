@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import gerar_alunos
+from etl.extract import flatten_data
+from etl.schema import TABELAS_BRUTAS
+from etl.transform import transformar_dados
+
+# ============================================================
+# 🔹 Benchmark das etapas do ETL com dados sintéticos
+#    (vazão e pico de memória por etapa, com comparação a um baseline)
+# ============================================================
+TAMANHOS = [1_000, 10_000, 100_000, 1_000_000]
+
+# "geracao" mede só o gerador sintético, que também roda dentro de "flatten"
+ETAPAS = ["geracao", "flatten", "transformacao", "carga"]
+
+TOLERANCIA = 0.20
+
+# Banco usado pela etapa "carga". Sem fallback para OLAP_DATABASE_URL de
+# propósito: a carga troca dim_aluno/fato_* inteiras pelos alunos sintéticos
+BENCH_DB_URL = os.getenv("BENCH_DB_URL")
+
+
+def executar_etapa(etapa, n_alunos, entrada, db_url=None):
+    """
+    Roda uma etapa e devolve (linhas produzidas, saída para a próxima etapa).
+    A carga vai para db_url, que precisa ser um banco descartável.
+    """
+    if etapa == "geracao":
+        return sum(1 for _ in gerar_alunos(n_alunos)), None
+
+    if etapa == "flatten":
+        dfs = flatten_data(gerar_alunos(n_alunos))
+        return sum(len(df) for df in dfs.values()), dfs
+
+    if etapa == "transformacao":
+        resultados = transformar_dados(*(entrada[tabela] for tabela in TABELAS_BRUTAS))
+        return sum(len(df) for df in resultados.values()), dict(entrada, **resultados)
+
+    if etapa == "carga":
+        from etl.load import load_dfs, TABELAS_OLAP  # só exige o banco OLAP quando a carga é medida
+
+        if not db_url:
+            raise ValueError("A etapa 'carga' exige um banco de benchmark (--db-url ou BENCH_DB_URL).")
+        load_dfs(entrada, db_url=db_url)
+        return sum(len(entrada[chave]) for chave in TABELAS_OLAP), entrada
+
+    raise ValueError(f"Etapa desconhecida: {etapa}")
+
+
+def medir_etapa(etapa, n_alunos, entrada, repeticoes=1, memoria=True, db_url=None):
+    """
+    Mede a etapa: melhor tempo entre as repetições e, numa execução extra
+    com tracemalloc, o pico de memória alocada pelo Python.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        linhas, saida = executar_etapa(etapa, n_alunos, entrada, db_url)
+        tempos.append(time.perf_counter() - inicio)
+
+    pico_mb = None
+    if memoria:
+        tracemalloc.start()
+        executar_etapa(etapa, n_alunos, entrada, db_url)
+        pico_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    segundos = min(tempos)
+    resultado = {
+        "alunos": n_alunos,
+        "etapa": etapa,
+        "segundos": segundos,
+        "linhas": linhas,
+        "alunos_por_segundo": n_alunos / segundos,
+        "linhas_por_segundo": linhas / segundos,
+        "pico_mb": pico_mb,
+    }
+    return resultado, saida
+
+
+def comparar(resultados, baseline, tolerancia=TOLERANCIA):
+    """
+    Compara com um baseline gravado por --saida e devolve as regressões:
+    vazão menor ou pico de memória maior que a tolerância permite.
+    """
+    base = {(r["alunos"], r["etapa"]): r for r in baseline["resultados"]}
+    regressoes = []
+    for r in resultados:
+        anterior = base.get((r["alunos"], r["etapa"]))
+        if anterior is None:
+            continue
+        if r["alunos_por_segundo"] < anterior["alunos_por_segundo"] * (1 - tolerancia):
+            regressoes.append(f"{r['etapa']} @ {r['alunos']}: vazão {r['alunos_por_segundo']:,.0f} alunos/s "
+                              f"(baseline {anterior['alunos_por_segundo']:,.0f})")
+        if r["pico_mb"] and anterior.get("pico_mb") and r["pico_mb"] > anterior["pico_mb"] * (1 + tolerancia):
+            regressoes.append(f"{r['etapa']} @ {r['alunos']}: pico {r['pico_mb']:.1f} MB "
+                              f"(baseline {anterior['pico_mb']:.1f} MB)")
+    return regressoes
+
+
+def main(tamanhos, etapas, repeticoes=1, memoria=True, saida=None, baseline=None, tolerancia=TOLERANCIA,
+         db_url=BENCH_DB_URL):
+    if "carga" in etapas and not db_url:
+        print("❌ A etapa 'carga' substitui dim_aluno/fato_* no banco de destino: informe um banco de "
+              "benchmark com --db-url ou BENCH_DB_URL (o OLAP configurado nunca é usado).")
+        return 2
+
+    resultados = []
+    ultima = max(ETAPAS.index(etapa) for etapa in etapas)
+    print(f"{'alunos':>10} {'etapa':>14} {'linhas':>12} {'tempo (s)':>10} {'alunos/s':>12} "
+          f"{'linhas/s':>12} {'pico (MB)':>10}")
+    for n in tamanhos:
+        # Cada etapa consome a saída da anterior; as que não foram pedidas rodam sem medição
+        entrada = None
+        for etapa in ETAPAS[1:ultima + 1]:
+            if etapa in etapas:
+                r, entrada = medir_etapa(etapa, n, entrada, repeticoes=repeticoes, memoria=memoria, db_url=db_url)
+                resultados.append(r)
+                _imprimir(r)
+            else:
+                _, entrada = executar_etapa(etapa, n, entrada, db_url)
+        del entrada
+
+        if "geracao" in etapas:
+            r, _ = medir_etapa("geracao", n, None, repeticoes=repeticoes, memoria=memoria)
+            resultados.append(r)
+            _imprimir(r)
+
+    if saida:
+        with open(saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "gerado_em": datetime.now().isoformat(timespec="seconds"),
+                "ambiente": {
+                    "python": platform.python_version(),
+                    "pandas": pd.__version__,
+                    "maquina": platform.machine(),
+                    "cpus": os.cpu_count(),
+                },
+                "resultados": resultados,
+            }, f, indent=2)
+        print(f"💾 Resultados gravados em {saida}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressoes = comparar(resultados, json.load(f), tolerancia)
+        for regressao in regressoes:
+            print(f"⚠️ Regressão: {regressao}")
+        if regressoes:
+            return 1
+        print(f"✅ Sem regressões em relação a {baseline} (tolerância {tolerancia:.0%})")
+    return 0
+
+
+def _imprimir(r):
+    pico = f"{r['pico_mb']:>10.1f}" if r["pico_mb"] is not None else f"{'-':>10}"
+    print(f"{r['alunos']:>10} {r['etapa']:>14} {r['linhas']:>12} {r['segundos']:>10.2f} "
+          f"{r['alunos_por_segundo']:>12,.0f} {r['linhas_por_segundo']:>12,.0f} {pico}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do ETL com alunos sintéticos")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS)
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=["geracao", "flatten", "transformacao"],
+                        help="etapas medidas; 'carga' exige --db-url")
+    parser.add_argument("--repeticoes", type=int, default=1, help="execuções por etapa (vale a melhor)")
+    parser.add_argument("--sem-memoria", action="store_true", help="não faz a execução extra com tracemalloc")
+    parser.add_argument("--saida", metavar="JSON", help="grava os resultados (servem de baseline depois)")
+    parser.add_argument("--baseline", metavar="JSON", help="compara com um resultado anterior; sai com 1 se regredir")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="variação aceita em relação ao baseline")
+    parser.add_argument("--db-url", default=BENCH_DB_URL,
+                        help="banco descartável para a etapa 'carga' (padrão: BENCH_DB_URL; nunca o OLAP)")
+    args = parser.parse_args()
+    sys.exit(main(args.tamanhos, args.etapas, repeticoes=args.repeticoes, memoria=not args.sem_memoria,
+                  saida=args.saida, baseline=args.baseline, tolerancia=args.tolerancia, db_url=args.db_url))
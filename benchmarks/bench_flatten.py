@@ -0,0 +1,104 @@
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import gerar_alunos
+from etl.extract import flatten_data
+
+
+# ============================================================
+# 🔹 Implementação anterior (uma lista de dicts por tabela),
+#    mantida aqui apenas como referência de comparação
+# ============================================================
+def flatten_data_legado(raw):
+    alunos_data, historicos_data, itens_hist_data = [], [], []
+    questionarios_data, itens_quest_data, perguntas_data, opcoes_data = [], [], [], []
+
+    for aluno in raw:
+        alunos_data.append({
+            "id": aluno["id"], "nome": aluno["nome"], "email": aluno["email"],
+            "cidade": aluno["cidade"], "data_nascimento": aluno["dataNascimento"]
+        })
+        for h in aluno.get("historicosEscolares", []):
+            historicos_data.append({"id": h["id"], "aluno_id": aluno["id"], "serie": h["serie"], "ano": h["ano"]})
+            for item in h.get("itens", []):
+                itens_hist_data.append({
+                    "historico_id": h["id"], "aluno_id": aluno["id"], "disciplina": item["disciplina"],
+                    "area_conhecimento": item["areaConhecimento"], "nota": item["nota"],
+                    "frequencia": item["frequencia"]
+                })
+        for q in aluno.get("questionarios", []):
+            questionarios_data.append({
+                "id": q["id"], "aluno_id": aluno["id"], "tipo": q["tipo"],
+                "nome": q["nome"], "descricao": q.get("descricao")
+            })
+            for iq in q.get("itens", []):
+                itens_quest_data.append({
+                    "id": iq["id"], "questionario_id": q["id"], "aluno_id": aluno["id"],
+                    "sequencial": iq["sequencial"], "data_resposta": iq["dataResposta"],
+                    "resposta_texto": iq["respostaTexto"], "resposta_valor": iq.get("respostaValor"),
+                    "pergunta_id": iq["pergunta"]["id"],
+                    "opcao_id": iq["opcao"]["id"] if iq.get("opcao") else None
+                })
+                p = iq["pergunta"]
+                perguntas_data.append({"id": p["id"], "tipo": p["tipo"], "titulo": p["titulo"], "descricao": p["descricao"]})
+                if iq.get("opcao"):
+                    o = iq["opcao"]
+                    opcoes_data.append({"id": o["id"], "descricao": o["descricao"], "valor": o["valor"]})
+
+    return {
+        "alunos": pd.DataFrame(alunos_data),
+        "historicos": pd.DataFrame(historicos_data),
+        "itens_historico": pd.DataFrame(itens_hist_data),
+        "questionarios": pd.DataFrame(questionarios_data),
+        "itens_questionario": pd.DataFrame(itens_quest_data),
+        "perguntas": pd.DataFrame(perguntas_data),
+        "opcoes": pd.DataFrame(opcoes_data),
+    }
+
+
+IMPLEMENTACOES = {
+    "legado": flatten_data_legado,
+    "colunar": flatten_data,
+}
+
+
+def medir(funcao, n_alunos):
+    """
+    Executa funcao sobre n_alunos sintéticos duas vezes: uma para medir o
+    tempo e outra, com tracemalloc ativo, para medir o pico de memória.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        dfs = funcao(gerar_alunos(n_alunos))
+        segundos = time.perf_counter() - inicio
+        linhas = sum(len(df) for df in dfs.values())
+        del dfs
+
+        tracemalloc.start()
+        funcao(gerar_alunos(n_alunos))
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"segundos": segundos, "linhas": linhas, "linhas_por_segundo": linhas / segundos, "pico_mb": pico / 2**20}
+
+
+def main(tamanhos, implementacoes):
+    print(f"{'alunos':>10} {'implementação':>14} {'linhas':>12} {'tempo (s)':>10} {'linhas/s':>12} {'pico (MB)':>10}")
+    for n in tamanhos:
+        for nome in implementacoes:
+            r = medir(IMPLEMENTACOES[nome], n)
+            print(f"{n:>10} {nome:>14} {r['linhas']:>12} {r['segundos']:>10.2f} "
+                  f"{r['linhas_por_segundo']:>12,.0f} {r['pico_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do flatten_data (legado x colunar)")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--implementacoes", nargs="+", choices=list(IMPLEMENTACOES), default=list(IMPLEMENTACOES))
+    args = parser.parse_args()
+    main(args.tamanhos, args.implementacoes)
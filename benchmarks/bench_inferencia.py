@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from models.compilado import LIMITE_PASSOS, avaliar, compilar_pipeline, prever, verificar_paridade
+from models.registry import carregar_versao
+
+# ============================================================
+# 🔹 Benchmark da inferência: pipeline do sklearn × floresta compilada
+#    (latência de uma linha e de lotes, com conferência de paridade)
+# ============================================================
+TAMANHOS = [1, 10, 100, 1_000, 10_000]
+
+# Arquivo antigo de cada modelo, usado se o registro ainda não tiver versão ativa
+LEGADO = {"course_model": "models/course_model.joblib", "course_model_v2": "models/course_model_v2.joblib"}
+
+
+def gerar_linhas(ativo, n, seed=42):
+    """
+    Linhas sintéticas em torno da média de cada feature (pelo scaler do
+    pipeline), arredondadas como as notas e escalas do payload.
+    """
+    scaler = ativo.model.steps[0][1]
+    rng = np.random.default_rng(seed)
+    return np.round(scaler.mean_ + scaler.scale_ * rng.normal(size=(n, len(ativo.features))) * 1.5, 1)
+
+
+def medir(funcao, repeticoes):
+    """
+    Roda funcao repeticoes vezes (após um aquecimento) e devolve as
+    latências em ms.
+    """
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return np.array(tempos)
+
+
+def main(nome, versao=None, tamanhos=TAMANHOS, linhas_por_tamanho=20_000, saida=None):
+    ativo = carregar_versao(nome, versao, legado=LEGADO.get(nome))
+    compilado = ativo.compilado
+    if compilado is None:
+        print(f"🧩 Versão {ativo.versao} sem floresta compilada: compilando em memória")
+        compilado = compilar_pipeline(ativo.model)
+        ativo = ativo._replace(compilado=compilado)
+
+    print(f"🌲 {nome} {ativo.versao}: {len(compilado['raizes'])} árvores, {len(compilado['feature'])} nós, "
+          f"profundidade {compilado['profundidade']}")
+    print(f"{'linhas':>8} {'sklearn p50':>12} {'sklearn p95':>12} {'compilado p50':>14} {'compilado p95':>14} "
+          f"{'prever p50':>11} {'ganho':>7} {'paridade':>9}")
+
+    resultados = []
+    for n in tamanhos:
+        X = gerar_linhas(ativo, n)
+        X_df = pd.DataFrame(X, columns=list(ativo.features))
+        # Mais repetições para lotes pequenos, para percentis estáveis
+        repeticoes = max(3, min(500, linhas_por_tamanho // n))
+
+        sk = medir(lambda: ativo.model.predict_proba(X_df), repeticoes)
+        comp = medir(lambda: avaliar(compilado, X), repeticoes)
+        auto = medir(lambda: prever(ativo, X), repeticoes)
+        paridade = verificar_paridade(ativo.model, compilado, X_df)
+
+        r = {
+            "linhas": n,
+            "repeticoes": repeticoes,
+            "sklearn_p50_ms": float(np.median(sk)),
+            "sklearn_p95_ms": float(np.percentile(sk, 95)),
+            "compilado_p50_ms": float(np.median(comp)),
+            "compilado_p95_ms": float(np.percentile(comp, 95)),
+            "prever_p50_ms": float(np.median(auto)),
+            "paridade": paridade,
+        }
+        resultados.append(r)
+        print(f"{n:>8} {r['sklearn_p50_ms']:>12.3f} {r['sklearn_p95_ms']:>12.3f} {r['compilado_p50_ms']:>14.3f} "
+              f"{r['compilado_p95_ms']:>14.3f} {r['prever_p50_ms']:>11.3f} "
+              f"{r['sklearn_p50_ms'] / r['compilado_p50_ms']:>6.1f}x {'ok' if paridade['ok'] else 'DIVERGE':>9}")
+
+    print(f"ℹ️ prever usa a floresta compilada até {LIMITE_PASSOS} passos (linhas × profundidade) e o sklearn acima")
+
+    if saida:
+        with open(saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "gerado_em": datetime.now().isoformat(timespec="seconds"),
+                "modelo": {"nome": nome, "versao": ativo.versao, "profundidade": compilado["profundidade"],
+                           "arvores": len(compilado["raizes"]), "nos": len(compilado["feature"])},
+                "ambiente": {
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "sklearn": sklearn.__version__,
+                    "maquina": platform.machine(),
+                    "cpus": os.cpu_count(),
+                },
+                "resultados": resultados,
+            }, f, indent=2)
+        print(f"💾 Resultados gravados em {saida}")
+
+    return 0 if all(r["paridade"]["ok"] for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência da inferência: sklearn × floresta compilada")
+    parser.add_argument("--modelo", default="course_model_v2", choices=sorted(LEGADO), help="modelo no registro")
+    parser.add_argument("--versao", default=None, help="versão do registro (padrão: a ativa)")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS, help="linhas por chamada")
+    parser.add_argument("--linhas-por-tamanho", type=int, default=20_000,
+                        help="linhas avaliadas em cada tamanho (define as repetições)")
+    parser.add_argument("--saida", metavar="JSON", help="grava os resultados em JSON")
+    args = parser.parse_args()
+    sys.exit(main(args.modelo, args.versao, args.tamanhos, args.linhas_por_tamanho, args.saida))
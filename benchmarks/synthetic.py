@@ -0,0 +1,127 @@
+import argparse
+import contextlib
+import json
+import random
+import sys
+
+# ============================================================
+# 🔹 Gerador determinístico de alunos no formato da API OLTP
+#    (/api/export/alunos-detalhados)
+# ============================================================
+CIDADES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Recife", "Salvador", "Fortaleza"]
+SERIES = ["1º ano", "2º ano", "3º ano"]
+DISCIPLINAS = [
+    ("Matemática", "Exatas"), ("Física", "Exatas"), ("Química", "Exatas"),
+    ("Biologia", "Biológicas"), ("Anatomia", "Biológicas"),
+    ("Português", "Humanas"), ("História", "Humanas"), ("Geografia", "Humanas"),
+    ("Filosofia", "Humanas"), ("Inglês", "Humanas"),
+]
+DIMENSOES_MBTI = ["E/I", "S/N", "T/F", "J/P"]
+AREAS_VOCACIONAIS = ["Exatas", "Humanas", "Biológicas", "Negócios"]
+
+
+def gerar_alunos(n_alunos, seed=42, perguntas_mbti=20, perguntas_vocacionais=16):
+    """
+    Gera n_alunos no formato de alunos-detalhados, um por vez.
+
+    O resultado depende apenas dos parâmetros (mesma seed → mesmos dados).
+    As perguntas e opções formam um catálogo fixo compartilhado entre os
+    alunos, como no banco OLTP.
+    """
+    rng = random.Random(seed)
+
+    catalogo_mbti = [
+        {"id": 1 + k, "tipo": DIMENSOES_MBTI[k % 4], "titulo": f"Pergunta MBTI {k + 1}",
+         "descricao": "Escolha a opção que mais combina com você."}
+        for k in range(perguntas_mbti)
+    ]
+    catalogo_vocacional = [
+        {"id": 1001 + k, "tipo": AREAS_VOCACIONAIS[k % 4], "titulo": f"Pergunta vocacional {k + 1}",
+         "descricao": "Quanto você se interessa por esta atividade?"}
+        for k in range(perguntas_vocacionais)
+    ]
+    opcoes = [{"id": 1 + v, "descricao": f"Opção {v + 1}", "valor": v + 1} for v in range(5)]
+
+    for aluno_id in range(1, n_alunos + 1):
+        historicos = []
+        for s, serie in enumerate(SERIES[:rng.randint(1, len(SERIES))]):
+            historicos.append({
+                "id": aluno_id * 10 + s,
+                "serie": serie,
+                "ano": 2022 + s,
+                "itens": [
+                    {"disciplina": disciplina, "areaConhecimento": area,
+                     "nota": round(rng.uniform(3, 10), 1), "frequencia": rng.randint(60, 100)}
+                    for disciplina, area in DISCIPLINAS
+                ],
+            })
+
+        questionarios = []
+        for q, (tipo, catalogo) in enumerate([("MBTI", catalogo_mbti), ("Vocacional", catalogo_vocacional)]):
+            questionario_id = aluno_id * 10 + q
+            itens = []
+            for seq, pergunta in enumerate(catalogo, start=1):
+                opcao = opcoes[rng.randrange(len(opcoes))] if tipo == "MBTI" or rng.random() < 0.5 else None
+                valor = opcao["valor"] if opcao else rng.randint(1, 5)
+                itens.append({
+                    "id": questionario_id * 100 + seq,
+                    "sequencial": seq,
+                    "dataResposta": f"2025-{1 + aluno_id % 12:02d}-{1 + seq % 28:02d}T10:00:00",
+                    "respostaTexto": opcao["descricao"] if opcao else str(valor),
+                    "respostaValor": valor,
+                    "pergunta": pergunta,
+                    "opcao": opcao,
+                })
+            questionarios.append({
+                "id": questionario_id,
+                "tipo": tipo,
+                "nome": f"Questionário {tipo}",
+                "descricao": None,
+                "itens": itens,
+            })
+
+        yield {
+            "id": aluno_id,
+            "nome": f"Aluno {aluno_id}",
+            "email": f"aluno{aluno_id}@smartteaching.com.br",
+            "cidade": rng.choice(CIDADES),
+            "dataNascimento": f"{2005 + aluno_id % 5}-{1 + aluno_id % 12:02d}-{1 + aluno_id % 28:02d}",
+            "historicosEscolares": historicos,
+            "questionarios": questionarios,
+        }
+
+
+def escrever_json(alunos, destino, ndjson=False):
+    """
+    Grava os alunos em destino (arquivo texto) como um array JSON, igual
+    ao corpo da API, ou como NDJSON (um aluno por linha), sem montar a
+    lista inteira em memória.
+    """
+    total = 0
+    if not ndjson:
+        destino.write("[")
+    for aluno in alunos:
+        if ndjson:
+            destino.write(json.dumps(aluno, ensure_ascii=False) + "\n")
+        else:
+            destino.write(("," if total else "") + json.dumps(aluno, ensure_ascii=False))
+        total += 1
+    if not ndjson:
+        destino.write("]\n")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera alunos sintéticos no formato de /api/export/alunos-detalhados")
+    parser.add_argument("--alunos", type=int, default=1000, help="quantidade de alunos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--perguntas-mbti", type=int, default=20)
+    parser.add_argument("--perguntas-vocacionais", type=int, default=16)
+    parser.add_argument("--ndjson", action="store_true", help="um aluno por linha em vez de um array JSON")
+    parser.add_argument("--saida", metavar="ARQUIVO", help="arquivo de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    alunos = gerar_alunos(args.alunos, seed=args.seed, perguntas_mbti=args.perguntas_mbti,
+                          perguntas_vocacionais=args.perguntas_vocacionais)
+    with (open(args.saida, "w", encoding="utf-8") if args.saida else contextlib.nullcontext(sys.stdout)) as destino:
+        escrever_json(alunos, destino, ndjson=args.ndjson)
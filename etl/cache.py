@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+from etl.schema import TABELAS_BRUTAS
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Cache local (Parquet) das tabelas brutas extraídas
+# ============================================================
+CACHE_DIR = os.getenv("ETL_CACHE_DIR", "cache/extract")
+MAX_CACHES = int(os.getenv("ETL_MAX_CACHES", "3"))
+
+_ULTIMO = "ultimo.json"
+_MANIFESTO = "manifest.json"
+
+
+def chave_cache(info):
+    """
+    Chave do cache para uma extração: o ETag da API quando existir,
+    senão o SHA-256 do conteúdo recebido.
+    """
+    if info.get("etag"):
+        return "etag-" + hashlib.sha256(info["etag"].encode()).hexdigest()[:32]
+    return "sha256-" + info["sha256"][:32]
+
+
+def salvar_cache(dfs, info, diretorio=CACHE_DIR):
+    """
+    Grava as sete tabelas brutas em Parquet em <diretorio>/<chave>/ e
+    marca essa extração como a última. Se a chave já existe (mesmo
+    conteúdo), apenas atualiza o ponteiro.
+    """
+    chave = chave_cache(info)
+    destino = os.path.join(diretorio, chave)
+
+    if not os.path.exists(destino):
+        temporario = f"{destino}.tmp"
+        shutil.rmtree(temporario, ignore_errors=True)
+        os.makedirs(temporario)
+        gravar_tabelas(dfs, TABELAS_BRUTAS, temporario)
+        with open(os.path.join(temporario, _MANIFESTO), "w", encoding="utf-8") as f:
+            json.dump({
+                "chave": chave,
+                "etag": info.get("etag"),
+                "sha256": info.get("sha256"),
+                "criado_em": datetime.now().isoformat(timespec="seconds"),
+                "linhas": {tabela: len(dfs[tabela]) for tabela in TABELAS_BRUTAS},
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, destino)
+        logger.info(f"💾 Extração salva no cache: {destino}")
+    else:
+        logger.info(f"💾 Conteúdo idêntico já está no cache: {destino}")
+
+    with open(os.path.join(diretorio, _ULTIMO), "w", encoding="utf-8") as f:
+        json.dump({"chave": chave}, f)
+
+    _limpar_antigos(diretorio, manter=chave)
+    return chave
+
+
+def ultimo_manifesto(diretorio=CACHE_DIR):
+    """
+    Retorna o manifesto da última extração em cache (ou None).
+    """
+    try:
+        with open(os.path.join(diretorio, _ULTIMO), encoding="utf-8") as f:
+            chave = json.load(f)["chave"]
+        with open(os.path.join(diretorio, chave, _MANIFESTO), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, KeyError, json.JSONDecodeError):
+        return None
+
+
+def carregar_cache(chave=None, diretorio=CACHE_DIR):
+    """
+    Abre as tabelas brutas de uma extração em cache (a última, se chave
+    não for informada), lendo os arquivos Parquet por memory-map.
+    """
+    if chave is None:
+        manifesto = ultimo_manifesto(diretorio)
+        if manifesto is None:
+            raise FileNotFoundError(f"Nenhuma extração em cache em {diretorio}. Rode o ETL sem --from-cache primeiro.")
+        chave = manifesto["chave"]
+
+    origem = os.path.join(diretorio, chave)
+    dfs = ler_tabelas(TABELAS_BRUTAS, origem)
+    logger.info(f"♻️ Tabelas brutas carregadas do cache: {origem}")
+    return dfs
+
+
+def gravar_tabelas(dfs, tabelas, diretorio):
+    """
+    Grava cada DataFrame de tabelas em <diretorio>/<tabela>.parquet.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    for tabela in tabelas:
+        dfs[tabela].to_parquet(os.path.join(diretorio, f"{tabela}.parquet"), index=False, compression="snappy")
+
+
+def ler_tabelas(tabelas, diretorio):
+    """
+    Lê de volta (por memory-map) as tabelas gravadas por gravar_tabelas().
+    """
+    return {
+        tabela: pd.read_parquet(os.path.join(diretorio, f"{tabela}.parquet"), memory_map=True)
+        for tabela in tabelas
+    }
+
+
+def _limpar_antigos(diretorio, manter):
+    """
+    Mantém só as MAX_CACHES extrações mais recentes.
+    """
+    entradas = [
+        os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+        if os.path.isfile(os.path.join(diretorio, nome, _MANIFESTO)) and nome != manter
+    ]
+    entradas.sort(key=os.path.getmtime, reverse=True)
+    for antigo in entradas[max(0, MAX_CACHES - 1):]:
+        shutil.rmtree(antigo, ignore_errors=True)
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+
+from etl.cache import carregar_cache, gravar_tabelas, ler_tabelas
+from etl.schema import TABELAS_BRUTAS
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Checkpoints por etapa, para retomar execuções interrompidas
+# ============================================================
+STATE_DIR = os.getenv("ETL_STATE_DIR", "cache/state")
+
+TABELAS_FATO = ("fato_perfil", "fato_historico")
+
+_ESTADO = "estado.json"
+
+
+def iniciar_execucao(parametros, watermark=None, diretorio=STATE_DIR):
+    """
+    Começa uma execução nova: descarta checkpoints anteriores e grava o
+    estado inicial (nenhuma etapa concluída).
+    """
+    if os.path.exists(os.path.join(diretorio, _ESTADO)):
+        logger.info(f"🗑️ Descartando checkpoints de uma execução interrompida em {diretorio}")
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.makedirs(diretorio)
+
+    estado = {
+        "parametros": parametros,
+        "watermark": watermark,
+        "iniciado_em": datetime.now().isoformat(timespec="seconds"),
+        "etapas": {},
+        "carregadas": [],
+    }
+    _gravar_estado(estado, diretorio)
+    return estado
+
+
+def retomar_execucao(parametros, diretorio=STATE_DIR):
+    """
+    Lê o estado da última execução interrompida (ou None, se não houver).
+    Os parâmetros precisam ser os mesmos com que ela foi iniciada.
+    """
+    try:
+        with open(os.path.join(diretorio, _ESTADO), encoding="utf-8") as f:
+            estado = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if estado["parametros"] != parametros:
+        raise ValueError(
+            f"A execução interrompida usou outros parâmetros ({estado['parametros']}); "
+            "rode sem --resume para começar de novo."
+        )
+
+    concluidas = list(estado["etapas"]) + [f"carga:{chave}" for chave in estado["carregadas"]]
+    logger.info(f"⏯️ Retomando execução de {estado['iniciado_em']} — já concluído: {', '.join(concluidas) or 'nada'}")
+    return estado
+
+
+def registrar_extracao(estado, dfs, chave_cache=None, diretorio=STATE_DIR):
+    """
+    Marca a extração como concluída. Se as tabelas brutas já estão no
+    cache de extrações, guarda só a chave; senão grava-as em Parquet.
+    """
+    if chave_cache:
+        estado["etapas"]["extracao"] = {"cache": chave_cache}
+    else:
+        gravar_tabelas(dfs, TABELAS_BRUTAS, os.path.join(diretorio, "extracao"))
+        estado["etapas"]["extracao"] = {"arquivos": "extracao"}
+    _gravar_estado(estado, diretorio)
+
+
+def carregar_extracao(estado, diretorio=STATE_DIR):
+    """
+    Devolve as tabelas brutas registradas por registrar_extracao().
+    """
+    etapa = estado["etapas"]["extracao"]
+    if "cache" in etapa:
+        return carregar_cache(etapa["cache"])
+    return ler_tabelas(TABELAS_BRUTAS, os.path.join(diretorio, etapa["arquivos"]))
+
+
+def registrar_transformacao(estado, resultados, diretorio=STATE_DIR):
+    """
+    Grava as tabelas fato em Parquet e marca a transformação como concluída.
+    """
+    gravar_tabelas(resultados, TABELAS_FATO, os.path.join(diretorio, "transformacao"))
+    estado["etapas"]["transformacao"] = {"arquivos": "transformacao"}
+    _gravar_estado(estado, diretorio)
+
+
+def carregar_transformacao(estado, diretorio=STATE_DIR):
+    """
+    Devolve as tabelas fato registradas por registrar_transformacao().
+    """
+    return ler_tabelas(TABELAS_FATO, os.path.join(diretorio, estado["etapas"]["transformacao"]["arquivos"]))
+
+
+def registrar_carga(estado, chave, diretorio=STATE_DIR):
+    """
+    Marca a tabela chave (de TABELAS_OLAP) como já publicada no OLAP.
+    """
+    estado["carregadas"].append(chave)
+    _gravar_estado(estado, diretorio)
+
+
+def concluir_execucao(diretorio=STATE_DIR):
+    """
+    Execução terminada com sucesso: os checkpoints não são mais necessários.
+    """
+    shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def _gravar_estado(estado, diretorio):
+    # Escrita atômica: um estado.json pela metade tornaria a retomada impossível
+    temporario = os.path.join(diretorio, f"{_ESTADO}.tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, os.path.join(diretorio, _ESTADO))
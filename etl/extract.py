@@ -1,103 +1,298 @@
+import codecs
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+
+from etl.schema import SCHEMAS, TABELAS_BRUTAS, montar_df
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do corpo da resposta no modo streaming
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Paginação padrão da API de exportação
+TAMANHO_PAGINA = 500
+MAX_WORKERS = 4
+
+_WHITESPACE = " \t\n\r"
+_DELIMITADORES = _WHITESPACE + ",]"
+
 
 def extract_data(url: str):
     """
     Faz a extração de dados da API e retorna o JSON bruto.
     """
-    print(f"🔗 Extraindo dados de {url}...")
+    logger.info(f"🔗 Extraindo dados de {url}...")
     response = requests.get(url, verify=False)  # verify=False evita erro de certificado local
     response.raise_for_status()
     data = response.json()
-    print(f"✅ {len(data)} registros extraídos.")
+    logger.info(f"✅ {len(data)} registros extraídos.")
     return data
 
 
+def extract_data_stream(url: str, chunk_size: int = STREAM_CHUNK_SIZE, params=None, info=None, etag=None):
+    """
+    Extrai os dados da API em modo streaming.
+
+    O corpo da resposta é lido em blocos e o array JSON é decodificado
+    elemento a elemento, devolvendo um gerador de alunos. Assim a memória
+    fica limitada a um registro de aluno por vez, e o flatten_data começa
+    a trabalhar antes do fim do download.
+
+    Se info (dict) for informado, recebe no final o "etag" da resposta e
+    o "sha256" do corpo (chaves do cache local). Com etag, a requisição é
+    condicional: se a API responder 304, nada é extraído e
+    info["nao_modificado"] fica True.
+    """
+    logger.info(f"🔗 Extraindo dados de {url} (streaming)...")
+    headers = {"If-None-Match": etag} if etag else None
+    with requests.get(url, params=params, headers=headers, stream=True, verify=False) as response:  # verify=False evita erro de certificado local
+        if etag and response.status_code == 304:
+            logger.info("♻️ Export não modificado desde a última extração (ETag).")
+            if info is not None:
+                info.update(etag=etag, sha256=None, nao_modificado=True)
+            return
+
+        response.raise_for_status()
+        sha = hashlib.sha256()
+
+        def _blocos():
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                sha.update(chunk)
+                yield chunk
+
+        total = 0
+        for aluno in iter_json_array(_blocos()):
+            total += 1
+            yield aluno
+
+        if info is not None:
+            info.update(etag=response.headers.get("ETag"), sha256=sha.hexdigest(), nao_modificado=False)
+    logger.info(f"✅ {total} registros extraídos.")
+
+
+def extract_data_paginado(url: str, tamanho_pagina: int = TAMANHO_PAGINA, max_workers: int = MAX_WORKERS,
+                          param_pagina: str = "page", param_tamanho: str = "pageSize", primeira_pagina: int = 1,
+                          params=None, info=None):
+    """
+    Extrai os dados da API página a página, buscando até max_workers
+    páginas em paralelo por uma Session com pool de conexões.
+
+    Devolve um gerador de alunos: cada página é repassada ao flatten_data
+    assim que chega (na ordem das páginas), e a extração termina na
+    primeira página vazia ou incompleta. Se info (dict) for informado,
+    recebe no final o "sha256" do conteúdo das páginas, em ordem.
+
+    Levanta ValueError se a API ignorar a paginação (uma página maior que
+    tamanho_pagina, ou a segunda página igual à primeira): sem isso, a
+    extração repetiria o export inteiro para sempre.
+    """
+    logger.info(f"🔗 Extraindo dados de {url} (paginado: {tamanho_pagina} por página, {max_workers} conexões)...")
+
+    session = requests.Session()
+    session.verify = False  # evita erro de certificado local
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    def _buscar_pagina(pagina):
+        response = session.get(url, params={**(params or {}), param_pagina: pagina, param_tamanho: tamanho_pagina})
+        response.raise_for_status()
+        return response.content
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pendentes = {}
+    try:
+        proxima = primeira_pagina
+        for _ in range(max_workers):
+            pendentes[proxima] = executor.submit(_buscar_pagina, proxima)
+            proxima += 1
+
+        pagina, total, sha = primeira_pagina, 0, hashlib.sha256()
+        primeiro_conteudo = None
+        while True:
+            conteudo = pendentes.pop(pagina).result()
+            sha.update(conteudo)
+            alunos = json.loads(conteudo)
+            if len(alunos) > tamanho_pagina:
+                raise ValueError(f"A página {pagina} veio com {len(alunos)} alunos (máximo {tamanho_pagina}): "
+                                 f"a API ignorou {param_pagina}/{param_tamanho}.")
+            if pagina == primeira_pagina:
+                primeiro_conteudo = conteudo
+            elif primeiro_conteudo is not None:
+                if conteudo == primeiro_conteudo:
+                    raise ValueError(f"A página {pagina} repete a página {primeira_pagina}: "
+                                     f"a API ignorou o parâmetro {param_pagina}.")
+                primeiro_conteudo = None
+            total += len(alunos)
+            yield from alunos
+
+            if len(alunos) < tamanho_pagina:
+                break
+
+            pendentes[proxima] = executor.submit(_buscar_pagina, proxima)
+            proxima += 1
+            pagina += 1
+
+        if info is not None:
+            info.update(etag=None, sha256=sha.hexdigest(), nao_modificado=False)
+        logger.info(f"✅ {total} registros extraídos em {pagina - primeira_pagina + 1} páginas.")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
+
+
+def iter_json_array(chunks):
+    """
+    Decodifica incrementalmente um array JSON recebido em blocos de bytes,
+    devolvendo um elemento por vez.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer, pos, esgotado = "", 0, False
+
+    def _ler_mais():
+        nonlocal buffer, pos, esgotado
+        for chunk in chunks:
+            if chunk:
+                buffer = buffer[pos:] + utf8.decode(chunk)
+                pos = 0
+                return
+        buffer = buffer[pos:] + utf8.decode(b"", final=True)
+        pos = 0
+        esgotado = True
+
+    def _proximo_caractere():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if esgotado:
+                return None
+            _ler_mais()
+
+    if _proximo_caractere() != "[":
+        raise ValueError("A resposta da API não é um array JSON.")
+    pos += 1
+
+    primeiro = True
+    while True:
+        c = _proximo_caractere()
+        if c is None:
+            raise ValueError("Array JSON incompleto na resposta da API.")
+        if c == "]":
+            return
+        if not primeiro:
+            if c != ",":
+                raise ValueError(f"Separador inesperado {c!r} no array JSON.")
+            pos += 1
+            _proximo_caractere()
+
+        # Só aceita o elemento quando ele é seguido de um delimitador, para não
+        # cortar números/literais que ainda continuam no próximo bloco.
+        while True:
+            try:
+                elemento, fim = decoder.raw_decode(buffer, pos)
+                if esgotado or (fim < len(buffer) and buffer[fim] in _DELIMITADORES):
+                    break
+            except json.JSONDecodeError:
+                if esgotado:
+                    raise
+            _ler_mais()
+
+        pos = fim
+        primeiro = False
+        yield elemento
+
+
 def flatten_data(raw):
-    alunos_data, historicos_data, itens_hist_data = [], [], []
-    questionarios_data, itens_quest_data, perguntas_data, opcoes_data = [], [], [], []
+    """
+    Converte os alunos (lista ou gerador, como o de extract_data_stream)
+    nas tabelas brutas do OLTP, consumindo um aluno por vez.
+
+    Os valores são acumulados em listas por coluna e cada DataFrame é
+    montado uma única vez, já com os tipos de etl.schema.SCHEMAS.
+    Perguntas e opções são dimensões: cada id entra uma única vez.
+    """
+    cols = {tabela: {col: [] for col in SCHEMAS[tabela]} for tabela in TABELAS_BRUTAS}
+    perguntas_vistas, opcoes_vistas = set(), set()
+
+    al, hi, ih = cols["alunos"], cols["historicos"], cols["itens_historico"]
+    qu, iq_, pe, op = cols["questionarios"], cols["itens_questionario"], cols["perguntas"], cols["opcoes"]
 
     for aluno in raw:
-        alunos_data.append({
-            "id": aluno["id"],
-            "nome": aluno["nome"],
-            "email": aluno["email"],
-            "cidade": aluno["cidade"],
-            "data_nascimento": aluno["dataNascimento"]
-        })
+        aluno_id = aluno["id"]
+        al["id"].append(aluno_id)
+        al["nome"].append(aluno["nome"])
+        al["email"].append(aluno["email"])
+        al["cidade"].append(aluno["cidade"])
+        al["data_nascimento"].append(aluno["dataNascimento"])
 
         # HISTÓRICOS
         for h in aluno.get("historicosEscolares", []):
-            historicos_data.append({
-                "id": h["id"],
-                "aluno_id": aluno["id"],
-                "serie": h["serie"],
-                "ano": h["ano"]
-            })
+            hist_id = h["id"]
+            hi["id"].append(hist_id)
+            hi["aluno_id"].append(aluno_id)
+            hi["serie"].append(h["serie"])
+            hi["ano"].append(h["ano"])
 
             for item in h.get("itens", []):
-                itens_hist_data.append({
-                    "historico_id": h["id"],
-                    "aluno_id": aluno["id"],
-                    "disciplina": item["disciplina"],
-                    "area_conhecimento": item["areaConhecimento"],
-                    "nota": item["nota"],
-                    "frequencia": item["frequencia"]
-                })
+                ih["historico_id"].append(hist_id)
+                ih["aluno_id"].append(aluno_id)
+                ih["disciplina"].append(item["disciplina"])
+                ih["area_conhecimento"].append(item["areaConhecimento"])
+                ih["nota"].append(item["nota"])
+                ih["frequencia"].append(item["frequencia"])
 
         # QUESTIONÁRIOS
         for q in aluno.get("questionarios", []):
-            questionarios_data.append({
-                "id": q["id"],
-                "aluno_id": aluno["id"],
-                "tipo": q["tipo"],
-                "nome": q["nome"],
-                "descricao": q.get("descricao")
-            })
+            quest_id = q["id"]
+            qu["id"].append(quest_id)
+            qu["aluno_id"].append(aluno_id)
+            qu["tipo"].append(q["tipo"])
+            qu["nome"].append(q["nome"])
+            qu["descricao"].append(q.get("descricao"))
 
             for iq in q.get("itens", []):
-                itens_quest_data.append({
-                    "id": iq["id"],
-                    "questionario_id": q["id"],
-                    "aluno_id": aluno["id"],
-                    "sequencial": iq["sequencial"],
-                    "data_resposta": iq["dataResposta"],
-                    "resposta_texto": iq["respostaTexto"],
-                    "resposta_valor": iq.get("respostaValor"),
-                    "pergunta_id": iq["pergunta"]["id"],
-                    "opcao_id": iq["opcao"]["id"] if iq.get("opcao") else None
-                })
-
-                # PERGUNTAS
                 p = iq["pergunta"]
-                perguntas_data.append({
-                    "id": p["id"],
-                    "tipo": p["tipo"],
-                    "titulo": p["titulo"],
-                    "descricao": p["descricao"]
-                })
-
-                # OPÇÕES
-                if iq.get("opcao"):
-                    o = iq["opcao"]
-                    opcoes_data.append({
-                        "id": o["id"],
-                        "descricao": o["descricao"],
-                        "valor": o["valor"]
-                    })
-
-    dfs = {
-        "alunos": pd.DataFrame(alunos_data),
-        "historicos": pd.DataFrame(historicos_data),
-        "itens_historico": pd.DataFrame(itens_hist_data),
-        "questionarios": pd.DataFrame(questionarios_data),
-        "itens_questionario": pd.DataFrame(itens_quest_data),
-        "perguntas": pd.DataFrame(perguntas_data),
-        "opcoes": pd.DataFrame(opcoes_data),
-    }
-
-    print("📊 Dados tabulares criados:")
+                o = iq.get("opcao")
+
+                iq_["id"].append(iq["id"])
+                iq_["questionario_id"].append(quest_id)
+                iq_["aluno_id"].append(aluno_id)
+                iq_["sequencial"].append(iq["sequencial"])
+                iq_["data_resposta"].append(iq["dataResposta"])
+                iq_["resposta_texto"].append(iq["respostaTexto"])
+                iq_["resposta_valor"].append(iq.get("respostaValor"))
+                iq_["pergunta_id"].append(p["id"])
+                iq_["opcao_id"].append(o["id"] if o else None)
+
+                # PERGUNTAS (uma linha por id)
+                if p["id"] not in perguntas_vistas:
+                    perguntas_vistas.add(p["id"])
+                    pe["id"].append(p["id"])
+                    pe["tipo"].append(p["tipo"])
+                    pe["titulo"].append(p["titulo"])
+                    pe["descricao"].append(p["descricao"])
+
+                # OPÇÕES (uma linha por id)
+                if o and o["id"] not in opcoes_vistas:
+                    opcoes_vistas.add(o["id"])
+                    op["id"].append(o["id"])
+                    op["descricao"].append(o["descricao"])
+                    op["valor"].append(o["valor"])
+
+    dfs = {tabela: montar_df(tabela, cols[tabela]) for tabela in TABELAS_BRUTAS}
+
+    logger.info("📊 Dados tabulares criados:")
     for k, df in dfs.items():
-        print(f"   - {k}: {len(df)}")
+        logger.info(f"   - {k}: {len(df)}")
+
+    return dfs
 
-    return dfs
\ No newline at end of file
@@ -0,0 +1,102 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Estado do ETL incremental no OLAP
+# ============================================================
+TABELA_ESTADO = "etl_estado"
+CHAVE_WATERMARK = "watermark_data_resposta"
+
+# Parâmetro enviado à API para pedir só os alunos alterados
+PARAM_ALTERADOS_DESDE = "alteradosDesde"
+
+
+def ler_watermark(engine):
+    """
+    Retorna a última data_resposta já carregada no OLAP (ISO 8601),
+    ou None se ainda não houve carga registrada.
+    """
+    with engine.begin() as conn:
+        _criar_tabela_estado(conn)
+        return conn.execute(
+            text(f"SELECT valor FROM {TABELA_ESTADO} WHERE chave = :chave"),
+            {"chave": CHAVE_WATERMARK}
+        ).scalar()
+
+
+def salvar_watermark(engine, valor):
+    """
+    Grava o novo watermark na tabela de estado do OLAP.
+    """
+    with engine.begin() as conn:
+        _criar_tabela_estado(conn)
+        conn.execute(
+            text(f"""
+                INSERT INTO {TABELA_ESTADO} (chave, valor, atualizado_em)
+                VALUES (:chave, :valor, now())
+                ON CONFLICT (chave) DO UPDATE SET valor = EXCLUDED.valor, atualizado_em = now()
+            """),
+            {"chave": CHAVE_WATERMARK, "valor": valor}
+        )
+    logger.info(f"🔖 Watermark atualizado: {valor}")
+
+
+def _criar_tabela_estado(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_ESTADO} (
+            chave TEXT PRIMARY KEY,
+            valor TEXT,
+            atualizado_em TIMESTAMPTZ
+        )
+    """))
+
+
+def filtrar_alunos_alterados(alunos, watermark):
+    """
+    Repassa apenas os alunos com alguma resposta posterior ao watermark.
+    Funciona mesmo que a API ignore o filtro de alterados.
+    """
+    limite = datetime.fromisoformat(watermark)
+    total, alterados = 0, 0
+
+    for aluno in alunos:
+        total += 1
+        marca = ultima_resposta(aluno)
+        if marca is not None and datetime.fromisoformat(marca) > limite:
+            alterados += 1
+            yield aluno
+
+    logger.info(f"🔎 {alterados} de {total} alunos alterados desde {watermark}.")
+
+
+def ultima_resposta(aluno):
+    """
+    Retorna a data da resposta mais recente do aluno (ou None).
+    """
+    datas = [
+        iq["dataResposta"]
+        for q in aluno.get("questionarios", [])
+        for iq in q.get("itens", [])
+        if iq.get("dataResposta")
+    ]
+    return max(datas, key=datetime.fromisoformat) if datas else None
+
+
+def novo_watermark(dfs, anterior=None):
+    """
+    Calcula o watermark após a carga: a maior data_resposta extraída
+    (ou o anterior, se nada mais novo chegou).
+    """
+    return maior_data(anterior, *dfs["itens_questionario"]["data_resposta"].dropna())
+
+
+def maior_data(*datas):
+    """
+    Retorna a mais recente das datas ISO 8601 informadas (ignora None).
+    """
+    datas = [d for d in datas if d]
+    return max(datas, key=datetime.fromisoformat) if datas else None
@@ -0,0 +1,263 @@
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Métricas por etapa do ETL (tempo, CPU, linhas, memória)
+# ============================================================
+METRICAS_DIR = os.getenv("ETL_METRICAS_DIR", "cache/metricas")
+
+# Capturas opcionais por etapa de primeiro nível
+PERFIS = ("cprofile", "tracemalloc")
+
+_registros = []
+_perfis = set()
+_lock = threading.Lock()
+
+# Etapas em andamento (podem se aninhar ou correr em threads) e o maior
+# VmHWM já lido: zerar o pico para uma etapa não pode apagar o das outras
+_abertas = {}  # id(registro) → maior RSS durante a etapa, até aqui
+_pico_visto_mb = 0.0
+
+
+def iniciar_coleta(perfis=()):
+    """
+    Zera as métricas coletadas e define as capturas opcionais
+    ("cprofile" e/ou "tracemalloc") das etapas de primeiro nível.
+    """
+    invalidos = set(perfis) - set(PERFIS)
+    if invalidos:
+        raise ValueError(f"Perfis desconhecidos: {sorted(invalidos)} (opções: {', '.join(PERFIS)})")
+
+    with _lock:
+        _registros.clear()
+        _perfis.clear()
+        _perfis.update(perfis)
+
+
+@contextmanager
+def medir(etapa, linhas_entrada=None):
+    """
+    Mede o bloco como a etapa informada. Subetapas usam nomes com ponto
+    ("transformacao.questionarios"); só as de primeiro nível recebem as
+    capturas de cProfile/tracemalloc.
+
+    Devolve o registro (dict) para o bloco informar "linhas_saida" ou
+    outros campos:
+
+        with medir("extracao") as m:
+            dfs = flatten_data(raw)
+            m["linhas_saida"] = len(dfs["alunos"])
+    """
+    registro = {"etapa": etapa, "linhas_entrada": linhas_entrada, "linhas_saida": None}
+    primeiro_nivel = "." not in etapa
+    perfil = cProfile.Profile() if primeiro_nivel and "cprofile" in _perfis else None
+    rastrear = primeiro_nivel and "tracemalloc" in _perfis and not tracemalloc.is_tracing()
+
+    if rastrear:
+        tracemalloc.start()
+    if perfil:
+        perfil.enable()
+    registro["rss_inicio_mb"] = rss_atual_mb()
+    _abrir_pico(registro)
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield registro
+    finally:
+        registro["segundos"] = time.perf_counter() - inicio
+        # CPU do processo inteiro (inclui as threads da etapa, não os subprocessos)
+        registro["cpu_segundos"] = time.process_time() - inicio_cpu
+        # RSS desta etapa: o atual no início e no fim e o maior durante ela
+        registro["rss_fim_mb"] = rss_atual_mb()
+        registro["pico_rss_mb"] = _fechar_pico(registro)
+        registro["pico_rss_processo_mb"] = pico_rss_processo_mb()
+        if perfil:
+            perfil.disable()
+            registro["cprofile"] = _salvar_perfil(perfil, etapa)
+        if rastrear:
+            registro["pico_python_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+        with _lock:
+            _registros.append(registro)
+        if primeiro_nivel:
+            logger.info(f"⏱️ {resumo(registro)}")
+        else:
+            logger.debug(f"⏱️ {resumo(registro)}")
+
+
+def rss_atual_mb():
+    """
+    RSS atual do processo, em MB (None fora do Linux).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+    except OSError:
+        return None
+    return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def pico_rss_processo_mb():
+    """
+    Maior RSS atingido pelo processo desde o início (não só na etapa
+    corrente), em MB (None fora do Unix).
+    """
+    if resource is None:
+        return None
+    # ru_maxrss vem em KB no Linux; o VmHWM zerado pelas etapas pode tê-lo rebaixado
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, _pico_visto_mb)
+
+
+def _ler_vmhwm_mb():
+    # Pico de RSS desde o último "5" em clear_refs (ou desde o início do processo)
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _zerar_vmhwm():
+    # Linux: "5" em clear_refs faz o VmHWM voltar ao RSS atual
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _acumular_pico():
+    # Com _lock: leva o pico lido até aqui a todas as etapas em andamento
+    global _pico_visto_mb
+    pico = _ler_vmhwm_mb()
+    if pico is not None:
+        _pico_visto_mb = max(_pico_visto_mb, pico)
+        for chave, pico_etapa in _abertas.items():
+            if pico_etapa is not None:
+                _abertas[chave] = max(pico_etapa, pico)
+
+
+def _abrir_pico(registro):
+    with _lock:
+        _acumular_pico()
+        _abertas[id(registro)] = rss_atual_mb() if _zerar_vmhwm() else None
+
+
+def _fechar_pico(registro):
+    """
+    Maior RSS do processo enquanto a etapa estava aberta, em MB (None se
+    o pico não pode ser zerado: fora do Linux ou sem acesso a clear_refs).
+    """
+    with _lock:
+        _acumular_pico()
+        return _abertas.pop(id(registro))
+
+
+def resumo(registro):
+    """
+    Linha legível com as métricas de uma etapa.
+    """
+    texto = f"{registro['etapa']}: {registro['segundos']:.2f}s (CPU {registro['cpu_segundos']:.2f}s)"
+    if registro["linhas_entrada"] is not None or registro["linhas_saida"] is not None:
+        texto += f", linhas {_fmt(registro['linhas_entrada'])} → {_fmt(registro['linhas_saida'])}"
+    if registro.get("rss_inicio_mb") is not None and registro.get("rss_fim_mb") is not None:
+        texto += f", RSS {registro['rss_inicio_mb']:.0f} → {registro['rss_fim_mb']:.0f} MB"
+    if registro.get("pico_rss_mb") is not None:
+        texto += f", pico RSS {registro['pico_rss_mb']:.0f} MB"
+    if registro.get("pico_rss_processo_mb") is not None:
+        texto += f", pico RSS do processo até aqui {registro['pico_rss_processo_mb']:.0f} MB"
+    if "pico_python_mb" in registro:
+        texto += f", pico Python {registro['pico_python_mb']:.1f} MB"
+    return texto
+
+
+def coletadas():
+    """
+    Cópia das métricas coletadas desde iniciar_coleta(), em ordem de término.
+    """
+    with _lock:
+        return [dict(r) for r in _registros]
+
+
+def exportar_json(caminho):
+    """
+    Grava as métricas coletadas em JSON.
+    """
+    _escrever_atomico(caminho, json.dumps({
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "pico_rss_processo_mb": pico_rss_processo_mb(),
+        "etapas": coletadas(),
+    }, ensure_ascii=False, indent=2))
+    logger.info(f"📈 Métricas gravadas em {caminho}")
+
+
+def exportar_prometheus(caminho):
+    """
+    Grava as métricas no formato texto do Prometheus (para o textfile
+    collector do node_exporter).
+    """
+    series = (
+        ("etl_etapa_segundos", "Tempo de relógio da etapa do ETL", "segundos"),
+        ("etl_etapa_cpu_segundos", "Tempo de CPU do processo durante a etapa", "cpu_segundos"),
+        ("etl_etapa_linhas_entrada", "Linhas recebidas pela etapa", "linhas_entrada"),
+        ("etl_etapa_linhas_saida", "Linhas produzidas pela etapa", "linhas_saida"),
+        ("etl_etapa_rss_inicio_bytes", "RSS do processo no início da etapa", "rss_inicio_mb"),
+        ("etl_etapa_rss_fim_bytes", "RSS do processo no fim da etapa", "rss_fim_mb"),
+        ("etl_etapa_pico_rss_bytes", "Maior RSS do processo durante a etapa", "pico_rss_mb"),
+        ("etl_processo_pico_rss_bytes", "Maior RSS do processo desde o início, medido ao fim da etapa",
+         "pico_rss_processo_mb"),
+    )
+    registros = coletadas()
+    linhas = []
+    for nome, ajuda, campo in series:
+        linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} gauge"]
+        for registro in registros:
+            valor = registro.get(campo)
+            if valor is None:
+                continue
+            if campo.endswith("_mb"):
+                valor = int(valor * 2**20)
+            linhas.append(f'{nome}{{etapa="{registro["etapa"]}"}} {valor}')
+    _escrever_atomico(caminho, "\n".join(linhas) + "\n")
+    logger.info(f"📈 Métricas Prometheus gravadas em {caminho}")
+
+
+def _salvar_perfil(perfil, etapa):
+    os.makedirs(METRICAS_DIR, exist_ok=True)
+    caminho = os.path.join(METRICAS_DIR, f"{etapa}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+    perfil.dump_stats(caminho)
+    logger.info(f"🔬 cProfile de {etapa} salvo em {caminho} (abra com: python -m pstats {caminho})")
+    return caminho
+
+
+def _escrever_atomico(caminho, conteudo):
+    # O coletor pode ler o arquivo a qualquer momento: nunca expor um arquivo pela metade
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def _fmt(linhas):
+    return "?" if linhas is None else f"{linhas:,}"
@@ -0,0 +1,167 @@
+import logging
+import queue
+import threading
+import time
+
+from etl.extract import flatten_data
+from etl.incremental import maior_data, novo_watermark
+from etl.load import TABELAS_OLAP, iniciar_staging, anexar_staging, publicar_staging
+from etl.schema import TABELAS_BRUTAS
+from etl.transform import transformar_dados, exigir_perfis_mbti, REGRAS_AREA_DISCIPLINA, AREA_PADRAO
+from utils.db import get_engine
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Execução em pipeline: extração → transformação → carga
+#    em lotes de alunos, com filas limitadas entre as etapas
+# ============================================================
+TAMANHO_LOTE = 5_000
+LOTES_EM_FILA = 4
+
+_FIM = object()
+
+
+def executar_pipeline(alunos, tamanho_lote=TAMANHO_LOTE, workers_transformacao=1, lotes_em_fila=LOTES_EM_FILA,
+                      regras_area=REGRAS_AREA_DISCIPLINA, area_padrao=AREA_PADRAO):
+    """
+    Processa os alunos (gerador de extract_data_stream/paginado) em lotes
+    que atravessam as etapas ao mesmo tempo: enquanto um lote é carregado,
+    o seguinte é transformado e o próximo é extraído.
+
+    As filas entre as etapas têm no máximo lotes_em_fila lotes, então uma
+    etapa rápida espera pela mais lenta (backpressure) em vez de acumular
+    dados em memória. Como todas as agregações são por aluno e cada aluno
+    está em um único lote, os fatos são os mesmos da execução completa
+    (um lote sem respostas MBTI não tem perfis; só o conjunto precisa ter).
+    A carga vai para as tabelas de staging e só é publicada no fim.
+
+    Retorna um resumo com contagens, tempos por etapa e o novo watermark.
+    """
+    engine = get_engine()
+    fila_lotes = queue.Queue(maxsize=lotes_em_fila)
+    fila_carga = queue.Queue(maxsize=lotes_em_fila)
+    parar = threading.Event()
+    erros = []
+    tempos = {"extracao": 0.0, "transformacao": 0.0, "carga": 0.0}
+    lock = threading.Lock()
+
+    def _somar(etapa, inicio):
+        with lock:
+            tempos[etapa] += time.perf_counter() - inicio
+
+    def _colocar(fila, item):
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    def _retirar(fila):
+        while not parar.is_set():
+            try:
+                return fila.get(timeout=0.5)
+            except queue.Empty:
+                pass
+        return _FIM
+
+    def _falhar(erro):
+        erros.append(erro)
+        parar.set()
+
+    # 🔹 1️⃣ Extração: agrupa os alunos em lotes
+    def _extrair():
+        try:
+            lote, inicio = [], time.perf_counter()
+            for aluno in alunos:
+                lote.append(aluno)
+                if len(lote) == tamanho_lote:
+                    _somar("extracao", inicio)
+                    _colocar(fila_lotes, lote)
+                    lote, inicio = [], time.perf_counter()
+                if parar.is_set():
+                    return
+            _somar("extracao", inicio)
+            if lote:
+                _colocar(fila_lotes, lote)
+        except Exception as e:
+            _falhar(e)
+        finally:
+            for _ in range(workers_transformacao):
+                _colocar(fila_lotes, _FIM)
+
+    # 🔹 2️⃣ Transformação: flatten + fatos de cada lote
+    def _transformar():
+        try:
+            while (lote := _retirar(fila_lotes)) is not _FIM:
+                inicio = time.perf_counter()
+                dfs = flatten_data(lote)
+                fatos = transformar_dados(*[dfs[t] for t in TABELAS_BRUTAS],
+                                          regras_area=regras_area, area_padrao=area_padrao, exigir_mbti=False)
+                fatos["alunos"] = dfs["alunos"]
+                fatos["watermark"] = novo_watermark(dfs)
+                _somar("transformacao", inicio)
+                _colocar(fila_carga, fatos)
+        except Exception as e:
+            _falhar(e)
+        finally:
+            _colocar(fila_carga, _FIM)
+
+    threads = [threading.Thread(target=_extrair, name="etl-extracao", daemon=True)]
+    threads += [threading.Thread(target=_transformar, name=f"etl-transformacao-{i}", daemon=True)
+                for i in range(workers_transformacao)]
+
+    inicio_total = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    # 🔹 3️⃣ Carga: anexa cada lote às stagings (nesta thread)
+    iniciadas, linhas, lotes, watermark = set(), {}, 0, None
+    try:
+        finalizados = 0
+        while finalizados < workers_transformacao:
+            fatos = _retirar(fila_carga)
+            if fatos is _FIM:
+                finalizados += 1
+                continue
+
+            inicio = time.perf_counter()
+            for chave, (tabela, _) in TABELAS_OLAP.items():
+                df = fatos[chave]
+                if df.empty:
+                    continue
+                if tabela not in iniciadas:
+                    iniciar_staging(engine, df, tabela)
+                    iniciadas.add(tabela)
+                anexar_staging(engine, df, tabela)
+                linhas[tabela] = linhas.get(tabela, 0) + len(df)
+            watermark = maior_data(watermark, fatos["watermark"])
+            lotes += 1
+            _somar("carga", inicio)
+    except Exception as e:
+        _falhar(e)
+    finally:
+        for t in threads:
+            t.join()
+
+    if erros:
+        raise erros[0]
+    if lotes:
+        exigir_perfis_mbti(linhas.get(TABELAS_OLAP["fato_perfil"][0], 0))
+
+    # 🔹 Publica as tabelas só depois que todos os lotes chegaram
+    inicio = time.perf_counter()
+    for chave, (tabela, coluna) in TABELAS_OLAP.items():
+        if tabela in iniciadas:
+            publicar_staging(engine, tabela, (coluna,))
+    _somar("carga", inicio)
+
+    total = time.perf_counter() - inicio_total
+    logger.info(f"🏁 Pipeline concluído: {lotes} lotes em {total:.2f}s "
+                f"(extração {tempos['extracao']:.2f}s, transformação {tempos['transformacao']:.2f}s, "
+                f"carga {tempos['carga']:.2f}s)")
+    for tabela, n in linhas.items():
+        logger.info(f"   - {tabela}: {n} linhas")
+
+    return {"lotes": lotes, "linhas": linhas, "tempos": dict(tempos, total=total), "watermark": watermark}
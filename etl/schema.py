@@ -0,0 +1,106 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Tipos usados nas tabelas do ETL
+# ============================================================
+INTEIRO = "inteiro"            # inteiro reduzido ao menor tipo que comporta os valores
+INTEIRO_NULO = "inteiro_nulo"  # idem, aceitando nulos (Int8/Int16/...)
+REAL = "float32"
+CATEGORIA = "category"         # textos de baixa cardinalidade
+TEXTO = "object"
+
+# ============================================================
+# 🔹 Schemas das tabelas brutas (flatten_data) e dos fatos
+# ============================================================
+SCHEMAS = {
+    # alunos vira dim_aluno no OLAP: o id tem largura fixa, como o aluno_id dos fatos
+    "alunos": {
+        "id": "int32", "nome": TEXTO, "email": TEXTO, "cidade": CATEGORIA, "data_nascimento": TEXTO,
+    },
+    "historicos": {
+        "id": INTEIRO, "aluno_id": INTEIRO, "serie": CATEGORIA, "ano": INTEIRO,
+    },
+    "itens_historico": {
+        "historico_id": INTEIRO, "aluno_id": INTEIRO, "disciplina": CATEGORIA,
+        "area_conhecimento": CATEGORIA, "nota": REAL, "frequencia": REAL,
+    },
+    "questionarios": {
+        "id": INTEIRO, "aluno_id": INTEIRO, "tipo": CATEGORIA, "nome": CATEGORIA, "descricao": TEXTO,
+    },
+    "itens_questionario": {
+        "id": INTEIRO, "questionario_id": INTEIRO, "aluno_id": INTEIRO, "sequencial": INTEIRO,
+        "data_resposta": TEXTO, "resposta_texto": CATEGORIA, "resposta_valor": REAL,
+        "pergunta_id": INTEIRO, "opcao_id": INTEIRO_NULO,
+    },
+    "perguntas": {
+        "id": INTEIRO, "tipo": CATEGORIA, "titulo": TEXTO, "descricao": TEXTO,
+    },
+    "opcoes": {
+        "id": INTEIRO, "descricao": TEXTO, "valor": REAL,
+    },
+    # Nos fatos o aluno_id tem largura fixa: o tipo vira a coluna no OLAP (e a carga
+    # incremental anexa ids novos a ela)
+    "fato_perfil": {
+        "aluno_id": "int32", "E/I": REAL, "S/N": REAL, "T/F": REAL, "J/P": REAL,
+        "perfil_vocacional": REAL, "area_vocacional_predominante": CATEGORIA, "perfil_mbti": REAL,
+    },
+    "fato_historico": {
+        "aluno_id": "int32", "area_conhecimento": CATEGORIA, "nota": REAL,
+    },
+}
+
+TABELAS_BRUTAS = ["alunos", "historicos", "itens_historico", "questionarios",
+                  "itens_questionario", "perguntas", "opcoes"]
+
+
+def converter_coluna(valores, tipo):
+    """
+    Converte uma coluna (lista ou Series) para o tipo do schema.
+    """
+    if tipo == INTEIRO:
+        return pd.to_numeric(pd.Series(valores, dtype="int64"), downcast="integer")
+    if tipo == INTEIRO_NULO:
+        return pd.to_numeric(pd.Series(valores, dtype="Int64"), downcast="integer")
+    if isinstance(valores, pd.Series):
+        return valores.astype(tipo)
+    return pd.Series(valores, dtype=tipo)
+
+
+def montar_df(tabela, colunas):
+    """
+    Monta o DataFrame de uma tabela a partir das listas por coluna,
+    convertendo cada coluna direto para o tipo do schema.
+    """
+    return pd.DataFrame({col: converter_coluna(colunas[col], tipo) for col, tipo in SCHEMAS[tabela].items()})
+
+
+def aplicar_schema(df, tabela):
+    """
+    Converte as colunas de um DataFrame já existente para os tipos do
+    schema da tabela. Colunas fora do schema são mantidas como estão.
+    """
+    schema = SCHEMAS[tabela]
+    return df.assign(**{col: converter_coluna(df[col], schema[col]) for col in df.columns if col in schema})
+
+
+def relatorio_memoria(dfs):
+    """
+    Exibe e retorna o uso de memória (em MB) de cada DataFrame.
+    Só é calculado com o log em DEBUG (memory_usage(deep=True) percorre
+    todos os textos); fora disso retorna None.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return None
+
+    uso = {nome: df.memory_usage(deep=True).sum() / 2**20 for nome, df in dfs.items()}
+
+    logger.debug("🧮 Memória por tabela:")
+    for nome, mb in uso.items():
+        logger.debug(f"   - {nome}: {mb:.1f} MB ({len(dfs[nome])} linhas)")
+    logger.debug(f"   = total: {sum(uso.values()):.1f} MB")
+
+    return uso
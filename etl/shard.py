@@ -0,0 +1,109 @@
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from etl.schema import SCHEMAS, TABELAS_BRUTAS, aplicar_schema, montar_df
+from etl.transform import transformar_dados, exigir_perfis_mbti, REGRAS_AREA_DISCIPLINA, AREA_PADRAO
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Transformação em shards por aluno_id, em vários processos
+# ============================================================
+
+# Coluna com o id do aluno em cada tabela bruta (None = dimensão,
+# replicada em todos os shards)
+CHAVE_ALUNO = {
+    "alunos": "id",
+    "historicos": "aluno_id",
+    "itens_historico": "aluno_id",
+    "questionarios": "aluno_id",
+    "itens_questionario": "aluno_id",
+    "perguntas": None,
+    "opcoes": None,
+}
+
+
+def transformar_em_shards(dfs, n_shards=None, max_workers=None,
+                          regras_area=REGRAS_AREA_DISCIPLINA, area_padrao=AREA_PADRAO):
+    """
+    Executa transformar_dados em paralelo, um processo por shard.
+
+    As tabelas brutas são particionadas por hash do aluno_id (todas as
+    agregações são por aluno, então cada shard é independente) e gravadas
+    como Arrow IPC num diretório temporário; cada processo abre os seus
+    arquivos por memory-map em vez de receber os dados serializados.
+    Os fatos dos shards são concatenados no final (um shard sem respostas
+    MBTI não tem perfis; só o conjunto precisa ter).
+    """
+    n_shards = n_shards or os.cpu_count() or 1
+    logger.info(f"🧩 Transformando em {n_shards} shards...")
+
+    with tempfile.TemporaryDirectory(prefix="etl_shards_") as diretorio:
+        shards = particionar(dfs, n_shards, diretorio)
+
+        with ProcessPoolExecutor(max_workers=max_workers or n_shards) as executor:
+            futuros = [executor.submit(_transformar_shard, d, regras_area, area_padrao) for d in shards]
+            resultados = [f.result() for f in futuros]
+
+    fatos = {}
+    for tabela in ["fato_perfil", "fato_historico"]:
+        df = pd.concat([r[tabela] for r in resultados], ignore_index=True)
+        fatos[tabela] = aplicar_schema(df.sort_values("aluno_id", kind="stable", ignore_index=True), tabela)
+    exigir_perfis_mbti(len(fatos["fato_perfil"]))
+
+    logger.info(f"✅ Shards concluídos: {len(fatos['fato_perfil'])} perfis, {len(fatos['fato_historico'])} linhas de histórico.")
+    return fatos
+
+
+def particionar(dfs, n_shards, diretorio):
+    """
+    Grava as tabelas de cada shard em <diretorio>/<shard>/<tabela>.arrow
+    e retorna os diretórios dos shards que têm alunos.
+    """
+    shards = set()
+    for tabela in TABELAS_BRUTAS:
+        df, chave = dfs[tabela], CHAVE_ALUNO[tabela]
+        if chave is None:
+            continue
+        shard = pd.util.hash_array(df[chave].to_numpy()) % n_shards
+        for s, parte in df.groupby(shard, sort=False):
+            _gravar(parte, os.path.join(diretorio, str(s)), tabela)
+            if tabela == "alunos":
+                shards.add(s)
+
+    # 🔹 Dimensões (perguntas, opções) vão inteiras para todos os shards
+    for s in shards:
+        for tabela, chave in CHAVE_ALUNO.items():
+            if chave is None:
+                _gravar(dfs[tabela], os.path.join(diretorio, str(s)), tabela)
+
+    return [os.path.join(diretorio, str(s)) for s in sorted(shards)]
+
+
+def _gravar(df, diretorio, tabela):
+    os.makedirs(diretorio, exist_ok=True)
+    feather.write_feather(df.reset_index(drop=True), os.path.join(diretorio, f"{tabela}.arrow"),
+                          compression="uncompressed")
+
+
+def _ler(diretorio, tabela):
+    """
+    Abre a tabela do shard por memory-map (vazia se o shard não tem linhas dela).
+    """
+    caminho = os.path.join(diretorio, f"{tabela}.arrow")
+    if not os.path.exists(caminho):
+        return montar_df(tabela, {col: [] for col in SCHEMAS[tabela]})
+    return feather.read_table(caminho, memory_map=True).to_pandas()
+
+
+def _transformar_shard(diretorio, regras_area, area_padrao):
+    """
+    Executado no processo filho: lê as tabelas do shard e aplica transformar_dados.
+    """
+    dfs = [_ler(diretorio, tabela) for tabela in TABELAS_BRUTAS]
+    return transformar_dados(*dfs, regras_area=regras_area, area_padrao=area_padrao, exigir_mbti=False)
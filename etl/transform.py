@@ -1,110 +1,84 @@
+import json
+import logging
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 
+from etl.metricas import medir
+from etl.schema import aplicar_schema
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# 🔹 Regras de classificação das disciplinas em áreas
+#    (a primeira área com algum termo contido no nome vence)
+# ============================================================
+REGRAS_AREA_DISCIPLINA = (
+    ("Exatas", ("mat", "fis", "quim", "algoritmo", "calc")),
+    ("Biológicas", ("bio", "saúde", "anat", "fisio", "med")),
+)
+AREA_PADRAO = "Humanas"
+
+DIMENSOES_MBTI = ["E/I", "S/N", "T/F", "J/P"]
+AREAS_RIASEC = ["Exatas", "Humanas", "Biológicas", "Negócios"]
+
+
 # ============================================================
 # 🔹 Função principal de transformação
 # ============================================================
 def transformar_dados(df_alunos, df_historicos, df_itens_historico,
-                      df_questionarios, df_itens_questionario, df_perguntas, df_opcoes):
+                      df_questionarios, df_itens_questionario, df_perguntas, df_opcoes,
+                      regras_area=REGRAS_AREA_DISCIPLINA, area_padrao=AREA_PADRAO, exigir_mbti=True):
     """
     Responsável por transformar os dados brutos extraídos do OLTP
     em estruturas analíticas prontas para o OLAP.
+
+    regras_area/area_padrao permitem trocar a tabela de classificação
+    das disciplinas (ver carregar_regras_area).
+
+    Com exigir_mbti=False (lotes e shards, que podem não ter nenhuma
+    resposta MBTI), um lote sem MBTI gera fato_perfil vazio; quem junta
+    os lotes confere o total com exigir_perfis_mbti.
     """
 
-    print("🔄 Iniciando transformações...")
+    logger.info("🔄 Iniciando transformações...")
 
     # ============================================================
-    # 1️⃣ PERFIL MBTI — cálculo das médias das quatro dimensões
+    # 1️⃣ QUESTIONÁRIOS — médias MBTI e RIASEC numa única agregação
     # ============================================================
-    df_mbti = df_itens_questionario.merge(
-        df_perguntas, left_on="pergunta_id", right_on="id", suffixes=("_item", "_pergunta")
-    )
-
-    # 🔹 Normaliza o nome da coluna para evitar diferenças de maiúsculas/minúsculas
-    df_mbti["tipo"] = df_mbti["tipo"].astype(str).str.strip().str.upper()
-
-    # 🔹 Filtra apenas as dimensões MBTI
-    df_mbti = df_mbti[df_mbti["tipo"].isin(["E/I", "S/N", "T/F", "J/P"])]
+    with medir("transformacao.questionarios", linhas_entrada=len(df_itens_questionario)) as m:
+        df_mbti_agrupado, medias_areas = agregar_questionarios(df_itens_questionario, df_questionarios, df_perguntas)
+        m["linhas_saida"] = len(df_mbti_agrupado)
 
-    if df_mbti.empty:
-        raise RuntimeError("Nenhuma pergunta MBTI encontrada — verifique se as dimensões E/I, S/N, T/F, J/P existem no banco.")
-
-    # 🔹 Calcula as médias das respostas por dimensão MBTI
-    df_mbti_agrupado = (
-        df_mbti.groupby(["aluno_id", "tipo"])["resposta_valor"]
-        .mean()
-        .unstack(fill_value=0)
-        .reset_index()
-    )
+    if exigir_mbti:
+        exigir_perfis_mbti(len(df_mbti_agrupado))
 
-    print("✅ Perfis MBTI transformados com sucesso!")
-    print(df_mbti_agrupado.head())
+    logger.info("✅ Perfis MBTI transformados com sucesso!")
+    logger.debug("%s", df_mbti_agrupado.head())
 
 
     # ============================================================
     # 2️⃣ PERFIL VOCACIONAL — cálculo baseado em perguntas RIASEC
     # ============================================================
-    df_voc = (
-        df_itens_questionario
-        .merge(df_questionarios, left_on="questionario_id", right_on="id", suffixes=("_item", "_questionario"))
-        .merge(df_perguntas, left_on="pergunta_id", right_on="id", suffixes=("_item", "_pergunta"))
-    )
-
-    # 🔹 Detecta automaticamente a coluna que representa o tipo do questionário
-    col_tipo_q = None
-    possiveis_colunas = ["tipo_questionario", "tipo_item", "tipo", "tipo_questionario_item"]
-
-    for c in df_voc.columns:
-        if c.lower() in possiveis_colunas:
-            col_tipo_q = c
-            break
-
-    if not col_tipo_q:
-        raise KeyError(f"Não foi encontrada a coluna de tipo do questionário nas colunas: {df_voc.columns.tolist()}")
-    else:
-        print(f"📘 Coluna de tipo do questionário detectada automaticamente: {col_tipo_q}")
-
-    # 🔹 Normaliza e filtra apenas os questionários vocacionais
-    df_voc[col_tipo_q] = df_voc[col_tipo_q].astype(str).str.upper()
-    df_voc = df_voc[df_voc[col_tipo_q].str.contains("VOCACIONAL", na=False)]
-
-    if not df_voc.empty:
-        print(f"✅ Perguntas vocacionais encontradas: {len(df_voc)}")
-
-        # 🔹 Garante que a coluna aluno_id exista corretamente
-        if "aluno_id_item" in df_voc.columns:
-            df_voc["aluno_id"] = df_voc["aluno_id_item"]
-        elif "aluno_id_questionario" in df_voc.columns:
-            df_voc["aluno_id"] = df_voc["aluno_id_questionario"]
-        else:
-            raise KeyError(f"Coluna de aluno não encontrada em df_voc. Colunas disponíveis: {df_voc.columns.tolist()}")
-
-        # 🔹 Mapeia automaticamente a área RIASEC com base no tipo da pergunta
-        df_voc["area_riasec"] = df_voc["tipo_pergunta"].str.strip().str.capitalize()
-
-        # 🔹 Calcula médias por área RIASEC para cada aluno
-        medias_areas = (
-            df_voc.groupby(["aluno_id", "area_riasec"])["resposta_valor"]
-            .mean()
-            .unstack(fill_value=0)
-            .reset_index()
-        )
+    if not medias_areas.empty:
+        logger.info(f"✅ Alunos com perguntas vocacionais: {len(medias_areas)}")
 
         # 🔹 Normaliza as colunas esperadas (RIASEC simplificado)
-        riasec_cols = ["Exatas", "Humanas", "Biológicas", "Negócios"]
-        for col in riasec_cols:
+        for col in AREAS_RIASEC:
             if col not in medias_areas.columns:
                 medias_areas[col] = 0.0
 
         # 🔹 Determina área predominante e perfil de dispersão
-        medias_areas["area_vocacional_predominante"] = medias_areas[riasec_cols].idxmax(axis=1)
-        medias_areas["perfil_vocacional"] = medias_areas[riasec_cols].std(axis=1)
+        medias_areas["area_vocacional_predominante"] = medias_areas[AREAS_RIASEC].idxmax(axis=1)
+        medias_areas["perfil_vocacional"] = medias_areas[AREAS_RIASEC].std(axis=1)
 
-        print("✅ Perfil vocacional (RIASEC) gerado com sucesso!")
-        print(medias_areas.head())
+        logger.info("✅ Perfil vocacional (RIASEC) gerado com sucesso!")
+        logger.debug("%s", medias_areas.head())
 
         df_vocacional = medias_areas[["aluno_id", "perfil_vocacional", "area_vocacional_predominante"]]
     else:
-        print("⚠️ Nenhuma pergunta vocacional encontrada.")
+        logger.warning("⚠️ Nenhuma pergunta vocacional encontrada.")
         df_vocacional = pd.DataFrame(columns=["aluno_id", "perfil_vocacional", "area_vocacional_predominante"])
 
 
@@ -118,62 +92,154 @@ def transformar_dados(df_alunos, df_historicos, df_itens_historico,
     df_fato_perfil["area_vocacional_predominante"].fillna("N/A", inplace=True)
 
     # Criar o índice médio MBTI (média das quatro dimensões)
-    df_fato_perfil["perfil_mbti"] = df_fato_perfil[["E/I", "S/N", "T/F", "J/P"]].mean(axis=1)
+    df_fato_perfil["perfil_mbti"] = df_fato_perfil[DIMENSOES_MBTI].mean(axis=1)
 
-    print("✅ Fato de perfil consolidado com sucesso!")
-    print(df_fato_perfil.head())
+    logger.info("✅ Fato de perfil consolidado com sucesso!")
+    logger.debug("%s", df_fato_perfil.head())
 
 
     # ============================================================
     # 4️⃣ FATO HISTÓRICO — médias de notas por área
     # ============================================================
-    df_hist = df_itens_historico.merge(
-        df_historicos, left_on="historico_id", right_on="id", suffixes=("_item", "_hist")
-    )
+    with medir("transformacao.historico", linhas_entrada=len(df_itens_historico)) as m:
+        df_hist = df_itens_historico.merge(
+            df_historicos, left_on="historico_id", right_on="id", suffixes=("_item", "_hist"),
+            validate="many_to_one"
+        )
 
-    # 🔹 Garante que a coluna aluno_id esteja presente corretamente
-    if "aluno_id_item" in df_hist.columns:
-        df_hist["aluno_id"] = df_hist["aluno_id_item"]
-    elif "aluno_id_hist" in df_hist.columns:
-        df_hist["aluno_id"] = df_hist["aluno_id_hist"]
-    else:
-        raise KeyError("Nenhuma coluna aluno_id encontrada no histórico.")
+        # 🔹 Garante que a coluna aluno_id esteja presente corretamente
+        if "aluno_id_item" in df_hist.columns:
+            df_hist["aluno_id"] = df_hist["aluno_id_item"]
+        elif "aluno_id_hist" in df_hist.columns:
+            df_hist["aluno_id"] = df_hist["aluno_id_hist"]
+        else:
+            raise KeyError("Nenhuma coluna aluno_id encontrada no histórico.")
 
-    # 🔹 Classifica as disciplinas em áreas (Exatas, Humanas, Biológicas)
-    df_hist["area_conhecimento"] = df_hist["disciplina"].apply(classificar_area_disciplina)
+        # 🔹 Classifica as disciplinas em áreas (Exatas, Humanas, Biológicas)
+        df_hist["area_conhecimento"] = classificar_areas(df_hist["disciplina"], regras_area, area_padrao)
 
-    # 🔹 Calcula a média das notas por aluno e área
-    df_fato_historico = (
-        df_hist.groupby(["aluno_id", "area_conhecimento"])["nota"]
-        .mean()
-        .reset_index()
-    )
+        # 🔹 Calcula a média das notas por aluno e área
+        df_fato_historico = (
+            df_hist.groupby(["aluno_id", "area_conhecimento"], observed=True)["nota"]
+            .mean()
+            .reset_index()
+        )
+        m["linhas_saida"] = len(df_fato_historico)
 
-    print("✅ Fato histórico consolidado com sucesso!")
-    print(df_fato_historico.head())
+    logger.info("✅ Fato histórico consolidado com sucesso!")
+    logger.debug("%s", df_fato_historico.head())
 
 
     # ============================================================
     # 5️⃣ Retorno final (dicionário para carga)
     # ============================================================
     return {
-        "fato_perfil": df_fato_perfil,
-        "fato_historico": df_fato_historico
+        "fato_perfil": aplicar_schema(df_fato_perfil, "fato_perfil"),
+        "fato_historico": aplicar_schema(df_fato_historico, "fato_historico")
     }
 
 
+def exigir_perfis_mbti(alunos_com_mbti):
+    """
+    Falha se nenhum aluno tem respostas MBTI (as dimensões não existem no banco).
+    """
+    if not alunos_com_mbti:
+        raise RuntimeError("Nenhuma pergunta MBTI encontrada — verifique se as dimensões E/I, S/N, T/F, J/P existem no banco.")
+
+
 # ============================================================
-# 🔹 Função auxiliar — classificação automática das disciplinas
+# 🔹 Agregação dos questionários (MBTI + vocacional)
 # ============================================================
-def classificar_area_disciplina(nome_disciplina):
+def agregar_questionarios(df_itens_questionario, df_questionarios, df_perguntas):
     """
-    Classifica a disciplina automaticamente em uma das 3 grandes áreas.
+    Calcula, num único groupby, as médias por aluno das dimensões MBTI
+    (tipo da pergunta em E/I, S/N, T/F, J/P) e das áreas RIASEC (perguntas
+    de questionários vocacionais).
+
+    Os tipos são normalizados nas tabelas de dimensão (perguntas e
+    questionários, poucas linhas) e levados aos itens por lookup de id,
+    sem copiar nem normalizar a tabela de itens.
+    Retorna (df_mbti_agrupado, medias_areas), ambos com uma linha por aluno;
+    df_mbti_agrupado tem sempre as quatro dimensões (0 para as sem resposta,
+    como no unstack de todos os alunos juntos).
+    """
+    # 🔹 Normaliza os tipos uma vez, por id
+    tipo_pergunta = pd.Series(df_perguntas["tipo"].str.strip().to_numpy(), index=df_perguntas["id"])
+    dimensao_mbti = tipo_pergunta.str.upper()
+    dimensao_mbti = dimensao_mbti.where(dimensao_mbti.isin(DIMENSOES_MBTI))
+    area_riasec = tipo_pergunta.str.capitalize()
+
+    questionario_vocacional = pd.Series(
+        df_questionarios["tipo"].astype(str).str.upper().str.contains("VOCACIONAL", na=False).to_numpy(),
+        index=df_questionarios["id"]
+    )
+
+    # 🔹 Lookup many-to-one dos itens nas dimensões
+    pergunta_id = df_itens_questionario["pergunta_id"]
+    dim = pergunta_id.map(dimensao_mbti).to_numpy(dtype=object)
+    vocacional = df_itens_questionario["questionario_id"].map(questionario_vocacional).to_numpy(dtype=bool, na_value=False)
+    area = pergunta_id.map(area_riasec).to_numpy(dtype=object)
+
+    em_mbti = pd.notna(dim)
+    em_vocacional = vocacional & pd.notna(area)
+
+    # 🔹 Uma linha por (grupo, aluno, dimensão) — um item pode contar nos dois grupos
+    aluno_id = df_itens_questionario["aluno_id"].to_numpy()
+    valor = df_itens_questionario["resposta_valor"].to_numpy()
+    longo = pd.DataFrame({
+        "grupo": np.repeat(["mbti", "vocacional"], [em_mbti.sum(), em_vocacional.sum()]),
+        "aluno_id": np.concatenate([aluno_id[em_mbti], aluno_id[em_vocacional]]),
+        "dimensao": np.concatenate([dim[em_mbti], area[em_vocacional]]),
+        "resposta_valor": np.concatenate([valor[em_mbti], valor[em_vocacional]]),
+    })
+
+    medias = longo.groupby(["grupo", "aluno_id", "dimensao"])["resposta_valor"].mean()
+    grupos = set(medias.index.get_level_values("grupo"))
+
+    def _pivotar(grupo, nome_coluna):
+        if grupo not in grupos:
+            return pd.DataFrame(columns=["aluno_id"])
+        df = medias.xs(grupo, level="grupo").unstack(fill_value=0)
+        df.columns.name = nome_coluna
+        return df.reset_index()
+
+    mbti = _pivotar("mbti", "tipo").reindex(columns=["aluno_id", *DIMENSOES_MBTI], fill_value=0)
+    return mbti, _pivotar("vocacional", "area_riasec")
+
+
+# ============================================================
+# 🔹 Funções auxiliares — classificação automática das disciplinas
+# ============================================================
+@lru_cache(maxsize=4096)
+def classificar_area_disciplina(nome_disciplina, regras=REGRAS_AREA_DISCIPLINA, padrao=AREA_PADRAO):
+    """
+    Classifica a disciplina automaticamente em uma das grandes áreas.
     """
     nome = nome_disciplina.lower()
 
-    if any(x in nome for x in ["mat", "fis", "quim", "algoritmo", "calc"]):
-        return "Exatas"
-    elif any(x in nome for x in ["bio", "saúde", "anat", "fisio", "med"]):
-        return "Biológicas"
-    else:
-        return "Humanas"
\ No newline at end of file
+    for area, termos in regras:
+        if any(x in nome for x in termos):
+            return area
+    return padrao
+
+
+def classificar_areas(disciplinas, regras=REGRAS_AREA_DISCIPLINA, padrao=AREA_PADRAO):
+    """
+    Classifica uma coluna inteira de disciplinas: cada nome distinto é
+    classificado uma única vez e o resultado é mapeado de volta às linhas.
+    """
+    mapa = {nome: classificar_area_disciplina(nome, regras, padrao) for nome in disciplinas.dropna().unique()}
+    return disciplinas.map(mapa)
+
+
+def carregar_regras_area(caminho):
+    """
+    Lê uma tabela de regras em JSON no formato
+    {"padrao": "Humanas", "regras": {"Exatas": ["mat", ...], ...}}
+    e devolve (regras, padrao) para transformar_dados.
+    """
+    with open(caminho, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    regras = tuple((area, tuple(t.lower() for t in termos)) for area, termos in config["regras"].items())
+    return regras, config.get("padrao", AREA_PADRAO)
@@ -1,52 +1,233 @@
-from etl.extract import extract_data, flatten_data
-from etl.load import load_dfs
-from etl.transform import transformar_dados
+import argparse
+import logging
+import os
+from functools import partial
 
+from etl.cache import carregar_cache, salvar_cache, ultimo_manifesto
+from etl.checkpoint import (
+    iniciar_execucao, retomar_execucao, registrar_extracao, carregar_extracao,
+    registrar_transformacao, carregar_transformacao, registrar_carga, concluir_execucao
+)
+from etl.extract import extract_data_stream, extract_data_paginado, flatten_data, TAMANHO_PAGINA, MAX_WORKERS
+from etl.incremental import (
+    ler_watermark, salvar_watermark, filtrar_alunos_alterados, novo_watermark, PARAM_ALTERADOS_DESDE
+)
+from etl.load import load_dfs, upsert_dfs, TABELAS_OLAP
+from etl.metricas import (
+    iniciar_coleta, medir, exportar_json, exportar_prometheus, METRICAS_DIR, PERFIS
+)
+from etl.pipeline import executar_pipeline, TAMANHO_LOTE
+from etl.schema import relatorio_memoria
+from etl.shard import transformar_em_shards
+from etl.transform import transformar_dados, carregar_regras_area, REGRAS_AREA_DISCIPLINA, AREA_PADRAO
+from utils.db import get_engine
 
-def main():
-    print("🚀 Iniciando pipeline ETL...")
+logger = logging.getLogger(__name__)
 
+API_URL = "https://localhost:7033/api/export/alunos-detalhados"
+
+
+def main(paginado=False, tamanho_pagina=TAMANHO_PAGINA, workers=MAX_WORKERS, regras_area=None,
+         incremental=False, carga_paralela=False, pipeline=False, tamanho_lote=TAMANHO_LOTE, shards=0,
+         from_cache=None, sem_cache=False, resume=False, metricas=None, prometheus=None, perfil=()):
+    logger.info("🚀 Iniciando pipeline ETL...")
+
+    if pipeline and incremental:
+        raise ValueError("O modo pipeline faz apenas cargas completas; não combine com --incremental.")
+    if from_cache and (pipeline or incremental):
+        raise ValueError("--from-cache reaproveita uma extração completa; não combine com --pipeline ou --incremental.")
+    if resume and pipeline:
+        raise ValueError("O modo pipeline não grava checkpoints; não combine com --resume.")
+
+    regras, area_padrao = carregar_regras_area(regras_area) if regras_area else (REGRAS_AREA_DISCIPLINA, AREA_PADRAO)
+
+    # 🔹 Checkpoints por etapa: com --resume, continua da última etapa concluída
+    parametros = {"incremental": incremental, "regras_area": regras_area}
+    estado = retomar_execucao(parametros) if resume else None
+    if resume and estado is None:
+        logger.info("⏯️ Nenhuma execução interrompida encontrada — começando do zero.")
+
+    # 🔹 No modo incremental, só entram alunos com respostas após o watermark
+    if estado:
+        watermark = estado["watermark"]
+    else:
+        watermark = ler_watermark(get_engine()) if incremental else None
+        if not pipeline:
+            estado = iniciar_execucao(parametros, watermark)
+    params = {PARAM_ALTERADOS_DESDE: watermark} if watermark else None
+    if incremental:
+        logger.info(f"🔖 Modo incremental — watermark atual: {watermark or 'nenhum (carga completa)'}")
+
+    iniciar_coleta(perfil)
+    try:
+        _executar_etapas(estado, watermark, params, regras, area_padrao, paginado, tamanho_pagina, workers,
+                         incremental, carga_paralela, pipeline, tamanho_lote, shards, from_cache, sem_cache)
+    finally:
+        # 🔹 As métricas são gravadas mesmo se alguma etapa falhar
+        exportar_json(metricas or os.path.join(METRICAS_DIR, "ultima_execucao.json"))
+        if prometheus:
+            exportar_prometheus(prometheus)
+
+
+def _executar_etapas(estado, watermark, params, regras, area_padrao, paginado, tamanho_pagina, workers,
+                     incremental, carga_paralela, pipeline, tamanho_lote, shards, from_cache, sem_cache):
     # ============================================================
     # 1️⃣ EXTRAÇÃO — consome a API OLTP e gera os DataFrames brutos
     # ============================================================
-    raw = extract_data("https://localhost:7033/api/export/alunos-detalhados")
-    dfs = flatten_data(raw)
+    chave = None
+    if not (estado and "extracao" in estado["etapas"]) and not from_cache:
+        # 🔹 Extrações completas ficam em cache; com ETag, a API pode responder 304
+        usar_cache = not (incremental or pipeline or sem_cache)
+        manifesto = ultimo_manifesto() if usar_cache and not paginado else None
+        info = {}
 
-    print(f"🔗 Extraídos {len(dfs['alunos'])} alunos")
-    for k, v in dfs.items():
-        print(f"  - {k}: {len(v)}")
+        # 🔹 Os alunos são lidos em streaming (ou por páginas em paralelo) e achatados um a um
+        if paginado:
+            raw = extract_data_paginado(API_URL, tamanho_pagina=tamanho_pagina, max_workers=workers,
+                                        params=params, info=info)
+        else:
+            raw = extract_data_stream(API_URL, params=params, info=info,
+                                      etag=manifesto["etag"] if manifesto else None)
+        if watermark:
+            raw = filtrar_alunos_alterados(raw, watermark)
+
+        # 🔹 Modo pipeline: extração, transformação e carga simultâneas, em lotes
+        if pipeline:
+            with medir("pipeline") as m:
+                resumo = executar_pipeline(raw, tamanho_lote=tamanho_lote, regras_area=regras, area_padrao=area_padrao)
+                m.update(linhas_saida=sum(resumo["linhas"].values()), lotes=resumo["lotes"], subetapas=resumo["tempos"])
+            if resumo["watermark"]:
+                salvar_watermark(get_engine(), resumo["watermark"])
+            logger.info("🏁 ETL concluído com êxito!")
+            return
+
+    with medir("extracao") as m:
+        if estado and "extracao" in estado["etapas"]:
+            dfs = carregar_extracao(estado)
+        elif from_cache:
+            # 🔹 Reaproveita as tabelas brutas de uma extração anterior, sem chamar a API
+            dfs = carregar_cache(None if from_cache == "ultimo" else from_cache)
+            chave = ultimo_manifesto()["chave"] if from_cache == "ultimo" else from_cache
+        else:
+            dfs = flatten_data(raw)
+
+            if info.get("nao_modificado"):
+                chave = manifesto["chave"]
+                dfs = carregar_cache(chave)
+            elif usar_cache:
+                chave = salvar_cache(dfs, info)
+
+        if "extracao" not in estado["etapas"]:
+            registrar_extracao(estado, dfs, chave_cache=chave)
+        m["linhas_saida"] = len(dfs["alunos"])
+
+    logger.info(f"🔗 Extraídos {len(dfs['alunos'])} alunos")
+    relatorio_memoria(dfs)
+
+    if watermark and dfs["alunos"].empty:
+        concluir_execucao()
+        logger.info("🏁 Nenhum aluno alterado desde a última carga — nada a fazer.")
+        return
 
     # ============================================================
     # 2️⃣ TRANSFORMAÇÃO — gera fatos analíticos (perfil + histórico)
     # ============================================================
-    resultados = transformar_dados(
-        dfs["alunos"],
-        dfs["historicos"],
-        dfs["itens_historico"],
-        dfs["questionarios"],
-        dfs["itens_questionario"],
-        dfs["perguntas"],
-        dfs["opcoes"]
-    )
+    with medir("transformacao", linhas_entrada=len(dfs["alunos"])) as m:
+        if "transformacao" in estado["etapas"]:
+            resultados = carregar_transformacao(estado)
+        elif shards:
+            # 🔹 Particiona por aluno_id e transforma cada shard em um processo
+            resultados = transformar_em_shards(dfs, n_shards=shards, regras_area=regras, area_padrao=area_padrao)
+        else:
+            resultados = transformar_dados(
+                dfs["alunos"],
+                dfs["historicos"],
+                dfs["itens_historico"],
+                dfs["questionarios"],
+                dfs["itens_questionario"],
+                dfs["perguntas"],
+                dfs["opcoes"],
+                regras_area=regras,
+                area_padrao=area_padrao
+            )
+
+        if "transformacao" not in estado["etapas"]:
+            registrar_transformacao(estado, resultados)
+        m["linhas_saida"] = len(resultados["fato_perfil"]) + len(resultados["fato_historico"])
 
     df_fato_perfil = resultados["fato_perfil"]
     df_fato_historico = resultados["fato_historico"]
 
-    print("✅ Transformações concluídas com sucesso!")
-    print(f"   - fato_perfil: {len(df_fato_perfil)} registros")
-    print(f"   - fato_historico: {len(df_fato_historico)} registros")
+    logger.info("✅ Transformações concluídas com sucesso!")
+    relatorio_memoria(resultados)
 
     # ============================================================
     # 3️⃣ CARGA — envia os dados processados ao banco OLAP
     # ============================================================
     dfs["fato_perfil"] = df_fato_perfil
     dfs["fato_historico"] = df_fato_historico
-    load_dfs(dfs)
+    with medir("carga", linhas_entrada=sum(len(dfs[chave]) for chave in TABELAS_OLAP)) as m:
+        # 🔹 Cada tabela publicada vira checkpoint; na retomada, só as restantes são carregadas
+        # (registrar_carga acrescenta a estado["carregadas"]: a cópia guarda o que veio da execução interrompida)
+        ja_carregadas = list(estado["carregadas"])
+        ao_carregar = partial(registrar_carga, estado)
+        if watermark:
+            upsert_dfs(dfs, dfs["alunos"]["id"], ja_carregadas=ja_carregadas, ao_carregar=ao_carregar)
+        else:
+            load_dfs(dfs, paralelo=carga_paralela, ja_carregadas=ja_carregadas, ao_carregar=ao_carregar)
+        # Só as tabelas publicadas nesta execução
+        m["linhas_saida"] = sum(len(dfs[chave]) for chave in estado["carregadas"] if chave not in ja_carregadas)
+
+    # 🔹 Registra até onde os dados já foram carregados
+    marca = novo_watermark(dfs, watermark)
+    if marca:
+        salvar_watermark(get_engine(), marca)
+    concluir_execucao()
+
+    logger.info("✅ Dados carregados no OLAP com sucesso!")
+    logger.info("🏁 ETL concluído com êxito!")
 
 
-    print("✅ Dados carregados no OLAP com sucesso!")
-    print("🏁 ETL concluído com êxito!")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline ETL SmartTeaching (OLTP → OLAP)")
+    parser.add_argument("--paginado", action="store_true",
+                        help="extrai por páginas, com várias requisições em paralelo")
+    parser.add_argument("--tamanho-pagina", type=int, default=TAMANHO_PAGINA,
+                        help="alunos por página no modo paginado")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="requisições simultâneas no modo paginado")
+    parser.add_argument("--regras-area", metavar="JSON",
+                        help="arquivo com a tabela de classificação das disciplinas em áreas")
+    parser.add_argument("--incremental", action="store_true",
+                        help="processa e atualiza no OLAP apenas os alunos alterados desde a última carga")
+    parser.add_argument("--carga-paralela", action="store_true",
+                        help="carrega as tabelas do OLAP ao mesmo tempo, em conexões separadas")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="sobrepõe extração, transformação e carga, processando os alunos em lotes")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE,
+                        help="alunos por lote no modo pipeline")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="divide a transformação em N shards por aluno_id, um processo por shard")
+    parser.add_argument("--from-cache", nargs="?", const="ultimo", metavar="CHAVE",
+                        help="pula a extração e usa as tabelas brutas em cache (a última, ou a da CHAVE)")
+    parser.add_argument("--sem-cache", action="store_true",
+                        help="não grava a extração no cache local")
+    parser.add_argument("--resume", action="store_true",
+                        help="retoma a última execução interrompida a partir da última etapa concluída")
+    parser.add_argument("--metricas", metavar="JSON",
+                        help=f"arquivo das métricas por etapa (padrão: {METRICAS_DIR}/ultima_execucao.json)")
+    parser.add_argument("--prometheus", metavar="ARQUIVO",
+                        help="também grava as métricas no formato texto do Prometheus")
+    parser.add_argument("--perfil", action="append", choices=PERFIS, default=[],
+                        help="captura cProfile e/ou tracemalloc de cada etapa (pode repetir); na etapa "
+                             "\"pipeline\" o cProfile só vê a thread principal, não os workers de extração "
+                             "e transformação")
+    parser.add_argument("--log-level", default="INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+                        help="nível do log; DEBUG inclui amostras dos DataFrames e o uso de memória")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = vars(parse_args())
+    logging.basicConfig(level=args.pop("log_level"), format="%(message)s")
+    main(**args)
\ No newline at end of file
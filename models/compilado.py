@@ -0,0 +1,237 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from models.registry import carregar_versao, gravar_artefato, versao_atual
+
+# ============================================================
+# 🔹 Floresta compilada em arrays NumPy
+#    (o pipeline StandardScaler + RandomForestClassifier vira arrays
+#     planos de nós, avaliados para todas as árvores de uma vez)
+# ============================================================
+# Nome do artefato gravado ao lado do bundle no registro
+ARTEFATO = "compilado"
+
+# Linhas avaliadas por vez (limita os arrays linhas × árvores × classes)
+LINHAS_POR_BLOCO = 1024
+
+# Até quantos passos (linhas × profundidade) a floresta compilada é mais
+# rápida que o sklearn: ela ganha com folga em poucas linhas (sem o custo
+# fixo do predict_proba), o Cython do sklearn ganha em lotes grandes
+LIMITE_PASSOS = 2048
+
+# Diferença máxima aceita entre as probabilidades compiladas e as do sklearn
+TOLERANCIA = 1e-9
+
+
+def compilar_pipeline(pipe):
+    """
+    Converte o pipeline treinado em um dict de arrays:
+
+    - feature, limiar, filho: os nós de todas as árvores concatenados,
+      renumerados para que os dois filhos de cada nó fiquem lado a lado
+      (esquerdo em filho, direito em filho + 1);
+    - valor: distribuição de classes de cada nó, já normalizada;
+    - raizes: índice da raiz de cada árvore;
+    - profundidade: maior profundidade entre as árvores.
+
+    O scaler é embutido nos limiares (ver limiar_original), então a
+    predição compara as features originais. Folhas apontam para si
+    mesmas com limiar +inf: a descida não precisa testar quem já chegou.
+    """
+    clf = pipe.steps[-1][1]
+    n_features = clf.n_features_in_
+    mean, scale = np.zeros(n_features), np.ones(n_features)
+    for _, etapa in pipe.steps[:-1]:
+        if not isinstance(etapa, StandardScaler):
+            raise ValueError(f"Etapa {type(etapa).__name__} não pode ser compilada (só StandardScaler + floresta).")
+        # with_mean/with_std=False deixam mean_/scale_ como None
+        mean = mean + (etapa.mean_ if etapa.mean_ is not None else 0) * scale
+        scale = scale * (etapa.scale_ if etapa.scale_ is not None else 1)
+
+    feature, limiar, filho, valor, raizes = [], [], [], [], []
+    inicio = 0
+    for arvore in clf.estimators_:
+        tree = arvore.tree_
+        ordem = _ordem_irmaos(tree.children_left, tree.children_right)
+        posicao = np.empty(tree.node_count, dtype=np.int64)
+        posicao[ordem] = np.arange(tree.node_count) + inicio
+
+        esquerda = tree.children_left[ordem]
+        folha = esquerda == -1
+        f = np.where(folha, 0, tree.feature[ordem])
+        feature.append(f.astype(np.int32))
+        limiar.append(np.where(folha, np.inf, limiar_original(tree.threshold[ordem], mean[f], scale[f])))
+        filho.append(np.where(folha, posicao[ordem], posicao[np.maximum(esquerda, 0)]).astype(np.int32))
+
+        # Mesma normalização do predict_proba da árvore
+        v = tree.value[ordem, 0, :clf.n_classes_].astype(np.float64)
+        soma = v.sum(axis=1, keepdims=True)
+        valor.append(v / np.where(soma == 0, 1, soma))
+
+        raizes.append(inicio)
+        inicio += tree.node_count
+
+    return {
+        "feature": np.concatenate(feature),
+        "limiar": np.concatenate(limiar),
+        "filho": np.concatenate(filho),
+        "valor": np.concatenate(valor),
+        "raizes": np.array(raizes, dtype=np.int32),
+        "profundidade": max(arvore.tree_.max_depth for arvore in clf.estimators_),
+        "classes": np.asarray(clf.classes_),
+        "n_features": n_features,
+    }
+
+
+def _ordem_irmaos(esquerda, direita):
+    # Ordem em largura (raiz primeiro) com o filho direito logo após o esquerdo
+    ordem = [0]
+    for no in ordem:
+        if esquerda[no] != -1:
+            ordem += [esquerda[no], direita[no]]
+    return np.array(ordem, dtype=np.int64)
+
+
+def limiar_original(t, mean, scale):
+    """
+    Maior x (float64) com float32((x - mean) / scale) <= t: o teste de
+    cada nó no espaço das features originais.
+
+    As árvores comparam a feature padronizada convertida para float32,
+    e muitos limiares coincidem com um valor float32 de treino; o
+    simples t * scale + mean erraria o lado de valores que caem
+    exatamente no limiar. Como a padronização é monotônica, o limiar
+    exato é achado por bisseção (vetorizada para todos os nós).
+    """
+    def passa(x):
+        return ((x - mean) / scale).astype(np.float32) <= t
+
+    aprox = t * scale + mean
+    folga = scale * (np.abs(t) + 1) * 1e-6
+    baixo, alto = aprox - folga, aprox + folga
+    # Alarga o intervalo até conter a fronteira: passa(baixo) e não passa(alto)
+    while not (passa(baixo).all() and not passa(alto).any()):
+        folga = folga * 2
+        baixo = np.where(passa(baixo), baixo, aprox - folga)
+        alto = np.where(passa(alto), aprox + folga, alto)
+
+    while True:
+        abertos = np.nextafter(baixo, np.inf) < alto
+        if not abertos.any():
+            return baixo
+        meio = np.where(abertos, baixo + (alto - baixo) / 2, baixo)
+        ok = passa(meio)
+        baixo = np.where(abertos & ok, meio, baixo)
+        alto = np.where(abertos & ~ok, meio, alto)
+
+
+def avaliar(compilado, X):
+    """
+    Rótulo e probabilidades (iguais a predict/predict_proba do pipeline)
+    para as linhas de X, com uma única descida por todas as árvores.
+    Retorna (labels, probs).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != compilado["n_features"]:
+        raise ValueError(f"X deve ter {compilado['n_features']} colunas, recebeu formato {X.shape}.")
+
+    feature, limiar, filho, valor = compilado["feature"], compilado["limiar"], compilado["filho"], compilado["valor"]
+    raizes = compilado["raizes"]
+
+    probs = np.empty((len(X), valor.shape[1]))
+    for inicio in range(0, len(X), LINHAS_POR_BLOCO):
+        bloco = X[inicio:inicio + LINHAS_POR_BLOCO]
+        # 🔹 Um nó corrente por (linha, árvore); cada passo desce um nível em todas
+        deslocamento = (np.arange(len(bloco)) * bloco.shape[1])[:, None]
+        plano = bloco.ravel()
+        no = np.broadcast_to(raizes, (len(bloco), len(raizes)))
+        for _ in range(compilado["profundidade"]):
+            proximo = filho[no]
+            if (proximo == no).all():
+                break  # todas as descidas já chegaram a uma folha
+            no = proximo + (plano[deslocamento + feature[no]] > limiar[no])
+        # Soma árvore a árvore, na mesma ordem do RandomForestClassifier
+        probs[inicio:inicio + len(bloco)] = valor[no].sum(axis=1) / len(raizes)
+
+    return compilado["classes"][probs.argmax(axis=1)], probs
+
+
+def prever(ativo, X):
+    """
+    (labels, probs) do modelo ativo (um ModeloAtivo do registro): pela
+    floresta compilada, se a versão tiver uma e o lote for pequeno, ou
+    pelo pipeline do sklearn. X segue a ordem de ativo.features.
+    """
+    compilado = ativo.compilado
+    if compilado is not None and len(X) * max(compilado["profundidade"], 1) <= LIMITE_PASSOS:
+        return avaliar(compilado, X)
+    if not hasattr(X, "columns"):
+        X = pd.DataFrame(X, columns=list(ativo.features))
+    probs = ativo.model.predict_proba(X)
+    return ativo.model.classes_[probs.argmax(axis=1)], probs
+
+
+def verificar_paridade(pipe, compilado, X, tolerancia=TOLERANCIA):
+    """
+    Compara a floresta compilada com o pipeline do sklearn nas linhas de
+    X. Retorna {"linhas", "labels_diferentes", "max_diferenca", "ok"}.
+    """
+    labels, probs = avaliar(compilado, X)
+    if not hasattr(X, "columns") and hasattr(pipe, "feature_names_in_"):
+        X = pd.DataFrame(X, columns=pipe.feature_names_in_)
+    probs_sklearn = pipe.predict_proba(X)
+    labels_sklearn = pipe.classes_[probs_sklearn.argmax(axis=1)]
+    max_diferenca = float(np.abs(probs - probs_sklearn).max()) if len(probs) else 0.0
+    labels_diferentes = int((labels != labels_sklearn).sum())
+    return {
+        "linhas": len(probs),
+        "labels_diferentes": labels_diferentes,
+        "max_diferenca": max_diferenca,
+        "ok": labels_diferentes == 0 and max_diferenca <= tolerancia,
+    }
+
+
+def compilar_verificado(pipe, X):
+    """
+    Compila o pipeline e confere a paridade em X (os dados de treino).
+    Retorna o compilado, ou None se ele divergir do sklearn (nesse caso
+    os serviços continuam usando o pipeline).
+    """
+    compilado = compilar_pipeline(pipe)
+    paridade = verificar_paridade(pipe, compilado, X)
+    if not paridade["ok"]:
+        print(f"⚠️ Floresta compilada diverge do sklearn ({paridade}); a versão será usada sem ela.")
+        return None
+    print(f"🧩 Floresta compilada: {len(compilado['feature'])} nós, profundidade {compilado['profundidade']} "
+          f"(paridade em {paridade['linhas']} linhas, diferença máx. {paridade['max_diferenca']:.1e})")
+    return compilado
+
+
+# ============================================================
+# 🔹 Execução direta: compila uma versão já registrada
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compila a floresta de uma versão do registro em arrays NumPy")
+    parser.add_argument("nome", help="modelo no registro (ex.: course_model_v2)")
+    parser.add_argument("--versao", default=None, help="padrão: a versão ativa")
+    parser.add_argument("--linhas", type=int, default=10_000, help="linhas sintéticas para a verificação de paridade")
+    args = parser.parse_args()
+
+    versao = args.versao or versao_atual(args.nome)
+    if versao is None:
+        raise SystemExit(f"❌ {args.nome} não tem versão ativa no registro.")
+    ativo = carregar_versao(args.nome, versao)
+
+    # Sem os dados de treino, a paridade é conferida em linhas sorteadas em torno da média das features
+    pipe = ativo.model
+    scaler = pipe.steps[0][1]
+    rng = np.random.default_rng(42)
+    X = scaler.mean_ + scaler.scale_ * rng.normal(size=(args.linhas, len(ativo.features))) * 1.5
+
+    compilado = compilar_verificado(pipe, X)
+    if compilado is None:
+        raise SystemExit(1)
+    gravar_artefato(args.nome, versao, ARTEFATO, compilado)
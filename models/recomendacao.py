@@ -0,0 +1,165 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from etl.load import iniciar_staging, anexar_staging, publicar_staging
+from models.compilado import prever
+from models.registry import carregar_versao, versao_atual
+from models.train_v2 import montar_features, FEATURE_COLS, NOME_MODELO
+from utils.catalogo import (
+    carregar_cursos, compilar_catalogo, probs_por_area, colunas_por_area, expandir_cursos, top_k, COURSES_PATH
+)
+from utils.db import get_engine, dispose_engines
+
+# ============================================================
+# 🔹 Scoring em lote: materializa as recomendações no OLAP
+# ============================================================
+# Arquivo antigo, usado só enquanto o registro não tem versão ativa de NOME_MODELO
+MODEL_PATH = "models/course_model_v2.joblib"
+TABELA_RECOMENDACAO = "fato_recomendacao"
+
+# Alunos por faixa de aluno_id (cada faixa é lida e pontuada por um processo)
+ALUNOS_POR_FAIXA = 50_000
+
+# Mesmo mapeamento classe → área do serviço v2
+AREA_INDEX_MAP = {"Biológicas": 0, "Exatas": 1, "Humanas": 2, "Negócios": 3}
+LABEL_MAP = {0: "Biológicas", 1: "Exatas", 2: "Humanas", 3: "Negócios"}
+
+# Estado de cada processo do pool (carregado uma vez no initializer)
+_modelo = None
+_catalogo = None
+
+
+def faixas_aluno_id(engine, alunos_por_faixa=ALUNOS_POR_FAIXA):
+    """
+    Divide os aluno_id de fato_perfil em faixas [inicio, fim) com o
+    mesmo número de alunos (fim=None na última).
+    """
+    ids = pd.read_sql("SELECT aluno_id FROM fato_perfil ORDER BY aluno_id", engine)["aluno_id"].to_numpy()
+    inicios = ids[::alunos_por_faixa].tolist()
+    return list(zip(inicios, inicios[1:] + [None]))
+
+
+def ler_faixa(engine, inicio, fim):
+    """
+    Lê fato_historico e fato_perfil só dos alunos da faixa (usa os
+    índices por aluno_id das duas tabelas).
+    """
+    filtro = "aluno_id >= :inicio" + (" AND aluno_id < :fim" if fim is not None else "")
+    params = {"inicio": int(inicio)} if fim is None else {"inicio": int(inicio), "fim": int(fim)}
+    with engine.connect() as conn:
+        df_hist = pd.read_sql(text(f"SELECT * FROM fato_historico WHERE {filtro}"), conn, params=params)
+        df_perf = pd.read_sql(text(f"SELECT * FROM fato_perfil WHERE {filtro}"), conn, params=params)
+    return df_hist, df_perf
+
+
+def pontuar(df, ativo, catalogo):
+    """
+    Recomenda os TOP_K cursos de cada aluno de df (saída de
+    montar_features) com os mesmos pesos do /predict do serviço v2,
+    sem o ruído aleatório: o resultado materializado é determinístico.
+    Retorna uma linha por (aluno, posição).
+    """
+    X = df[FEATURE_COLS]
+    pred_labels, probs = prever(ativo, X)
+    prob_max = probs.max(axis=1)
+
+    # montar_features guarda as médias em 0–1; o score dos cursos usa a escala 0–10 do /predict
+    media_area = {
+        "Exatas": X["media_exatas"].to_numpy() * 10,
+        "Humanas": X["media_humanas"].to_numpy() * 10,
+        "Biológicas": X["media_biologicas"].to_numpy() * 10,
+    }
+    score_area = (
+        probs_por_area(catalogo, probs) * 0.6
+        + colunas_por_area(catalogo, media_area, X["media_global"].to_numpy() * 10) / 10 * 0.3
+        + prob_max[:, None] * 0.1
+    )
+    scores = np.round(expandir_cursos(catalogo, score_area), 3)
+    top = top_k(scores)
+
+    k = top.shape[1]
+    return pd.DataFrame({
+        "aluno_id": np.repeat(df["aluno_id"].to_numpy(), k).astype("int64"),
+        "posicao": np.tile(np.arange(1, k + 1, dtype="int16"), len(df)),
+        "curso": np.asarray(catalogo["nomes"], dtype=object)[top].ravel(),
+        "area": np.asarray(catalogo["areas_curso"], dtype=object)[top].ravel(),
+        "score": np.take_along_axis(scores, top, axis=1).ravel().astype("float32"),
+        "area_prevista": np.repeat([LABEL_MAP.get(int(c), "Desconhecido") for c in pred_labels], k),
+        "confianca": np.repeat(prob_max.round(3), k).astype("float32"),
+    })
+
+
+def _iniciar_worker(versao, courses_path):
+    global _modelo, _catalogo
+    # Os pools de conexão herdados do processo pai não podem ser reutilizados
+    dispose_engines()
+    # Carregado com mmap: os processos do pool compartilham os arrays do bundle
+    _modelo = carregar_versao(NOME_MODELO, versao, legado=MODEL_PATH)
+    _catalogo = compilar_catalogo(carregar_cursos(courses_path), AREA_INDEX_MAP)
+
+
+def pontuar_faixa(faixa):
+    """
+    Lê, monta as features e pontua uma faixa de alunos (roda no pool).
+    """
+    df_hist, df_perf = ler_faixa(get_engine(), *faixa)
+    if df_perf.empty:
+        return None
+
+    df = montar_features(df_hist, df_perf)
+    return pontuar(df, _modelo, _catalogo)
+
+
+def gerar_recomendacoes(versao=None, courses_path=COURSES_PATH, alunos_por_faixa=ALUNOS_POR_FAIXA,
+                        max_workers=None):
+    """
+    Pontua todos os alunos do OLAP e publica fato_recomendacao (staging
+    + COPY + índice por aluno_id + troca atômica). As faixas são
+    pontuadas em paralelo e carregadas à medida que ficam prontas.
+
+    Usa a versão informada do modelo ou a ativa no registro no início da
+    execução (todas as faixas com a mesma, mesmo se outra for ativada).
+    """
+    inicio = time.perf_counter()
+    versao = versao or versao_atual(NOME_MODELO)
+    engine = get_engine()
+    faixas = faixas_aluno_id(engine, alunos_por_faixa)
+    if not faixas:
+        raise RuntimeError("❌ fato_perfil está vazio. Rode o ETL primeiro.")
+
+    print(f"🎓 Gerando recomendações com o modelo {versao or MODEL_PATH}: "
+          f"{len(faixas)} faixas de até {alunos_por_faixa} alunos...")
+    alunos = linhas = 0
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=_iniciar_worker,
+                             initargs=(versao, courses_path)) as executor:
+        for df in executor.map(pontuar_faixa, faixas):
+            if df is None:
+                continue
+            if linhas == 0:
+                iniciar_staging(engine, df, TABELA_RECOMENDACAO)
+            anexar_staging(engine, df, TABELA_RECOMENDACAO)
+            linhas += len(df)
+            alunos += df["aluno_id"].nunique()
+
+    publicar_staging(engine, TABELA_RECOMENDACAO, ("aluno_id",))
+
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {TABELA_RECOMENDACAO}: {alunos} alunos, {linhas} linhas em {segundos:.2f}s "
+          f"({alunos / segundos:,.0f} alunos/s)")
+    return {"alunos": alunos, "linhas": linhas, "segundos": segundos}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materializa as recomendações de cursos no OLAP")
+    parser.add_argument("--versao", default=None, help="versão do registro (padrão: a ativa)")
+    parser.add_argument("--cursos", default=str(COURSES_PATH), help="catálogo de cursos")
+    parser.add_argument("--alunos-por-faixa", type=int, default=ALUNOS_POR_FAIXA)
+    parser.add_argument("--workers", type=int, default=None, help="processos de scoring (padrão: nº de CPUs)")
+    args = parser.parse_args()
+    gerar_recomendacoes(args.versao, args.cursos, args.alunos_por_faixa, args.workers)
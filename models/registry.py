@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+# ============================================================
+# 🔹 Registro de modelos versionados
+#
+#    models/registry/<nome>/<versao>/bundle.joblib  (nunca alterado)
+#    models/registry/<nome>/<versao>/metadata.json
+#    models/registry/<nome>/current                 (versão em uso)
+#
+#    Treinar cria uma versão nova; ativar ou fazer rollback só troca o
+#    ponteiro "current", que os serviços acompanham.
+# ============================================================
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "models/registry")
+
+_BUNDLE = "bundle.joblib"
+_METADADOS = "metadata.json"
+_ATUAL = "current"
+
+
+class ModeloAtivo(NamedTuple):
+    """
+    Modelo carregado para uso nos serviços. Nunca é alterado: trocar de
+    versão é trocar a referência inteira, então modelo, features e
+    rótulos são sempre consistentes entre si.
+    """
+    model: object
+    features: tuple
+    label_map: dict
+    versao: str
+    metadados: dict
+    compilado: dict = None  # floresta em arrays NumPy (models.compilado), se a versão tiver
+
+
+def hash_dados(X, y):
+    """
+    Hash (sha256) dos dados de treino: identifica com que dados cada
+    versão foi treinada.
+    """
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    h.update(json.dumps(list(X.columns)).encode())
+    return h.hexdigest()
+
+
+def registrar_modelo(nome, bundle, label_map=None, metricas=None, dados_hash=None, ativar=True, artefatos=None,
+                     diretorio=REGISTRY_DIR):
+    """
+    Grava o bundle ({"model", "features", ...}) e os artefatos derivados
+    ({nome: objeto}, ex.: a floresta compilada) como uma versão nova e,
+    se ativar, passa a usá-la. A versão só aparece no registro depois de
+    completa (gravada em um diretório temporário e renomeada).
+    Retorna o id da versão.
+    """
+    versao = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+    base = os.path.join(diretorio, nome)
+    temporario = os.path.join(base, f".{versao}.tmp")
+    os.makedirs(temporario)
+
+    # Sem compressão: só arquivos não comprimidos podem ser abertos com mmap
+    joblib.dump(bundle, os.path.join(temporario, _BUNDLE))
+    for artefato, objeto in (artefatos or {}).items():
+        if objeto is not None:
+            joblib.dump(objeto, os.path.join(temporario, f"{artefato}.joblib"))
+    metadados = {
+        "nome": nome,
+        "versao": versao,
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "features": list(bundle["features"]),
+        "label_map": {str(k): v for k, v in (label_map or {}).items()},
+        "dados_hash": dados_hash,
+        "metricas": metricas or {},
+        "sklearn": sklearn.__version__,
+        "numpy": np.__version__,
+    }
+    with open(os.path.join(temporario, _METADADOS), "w", encoding="utf-8") as f:
+        json.dump(metadados, f, ensure_ascii=False, indent=2)
+    os.rename(temporario, os.path.join(base, versao))
+
+    print(f"📦 Modelo {nome} registrado como versão {versao}")
+    if ativar:
+        ativar_versao(nome, versao, diretorio)
+    return versao
+
+
+def versao_atual(nome, diretorio=REGISTRY_DIR):
+    """
+    Versão em uso de nome (ou None, se nenhuma foi ativada).
+    """
+    try:
+        with open(os.path.join(diretorio, nome, _ATUAL), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def listar_versoes(nome, diretorio=REGISTRY_DIR):
+    """
+    Metadados de todas as versões de nome, da mais antiga para a mais nova.
+    """
+    base = os.path.join(diretorio, nome)
+    if not os.path.isdir(base):
+        return []
+    versoes = []
+    for versao in sorted(os.listdir(base)):
+        caminho = os.path.join(base, versao, _METADADOS)
+        if not versao.startswith(".") and os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                versoes.append(json.load(f))
+    return versoes
+
+
+def ativar_versao(nome, versao, diretorio=REGISTRY_DIR):
+    """
+    Passa a usar a versão informada (troca atômica do ponteiro "current").
+    """
+    if not os.path.exists(os.path.join(diretorio, nome, versao, _METADADOS)):
+        raise ValueError(f"Versão {versao} de {nome} não existe no registro {diretorio}.")
+
+    temporario = os.path.join(diretorio, nome, f"{_ATUAL}.tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(versao)
+    os.replace(temporario, os.path.join(diretorio, nome, _ATUAL))
+    print(f"✅ {nome}: versão {versao} ativada")
+
+
+def rollback(nome, diretorio=REGISTRY_DIR):
+    """
+    Volta para a versão anterior à que está em uso. Retorna a versão ativada.
+    """
+    atual = versao_atual(nome, diretorio)
+    anteriores = [m["versao"] for m in listar_versoes(nome, diretorio) if atual is None or m["versao"] < atual]
+    if not anteriores:
+        raise ValueError(f"{nome} não tem versão anterior a {atual} para rollback.")
+    ativar_versao(nome, anteriores[-1], diretorio)
+    return anteriores[-1]
+
+
+def gravar_artefato(nome, versao, artefato, objeto, diretorio=REGISTRY_DIR):
+    """
+    Acrescenta a uma versão existente um artefato derivado do seu bundle
+    (ex.: a floresta compilada de uma versão importada). O bundle e os
+    metadados não mudam.
+    """
+    pasta = os.path.join(diretorio, nome, versao)
+    if not os.path.exists(os.path.join(pasta, _METADADOS)):
+        raise ValueError(f"Versão {versao} de {nome} não existe no registro {diretorio}.")
+    temporario = os.path.join(pasta, f".{artefato}.joblib.tmp")
+    joblib.dump(objeto, temporario)
+    os.replace(temporario, os.path.join(pasta, f"{artefato}.joblib"))
+    print(f"💾 {nome} {versao}: artefato {artefato} gravado")
+
+
+def remover_versao(nome, versao, diretorio=REGISTRY_DIR):
+    """
+    Apaga uma versão que não está em uso (ex.: um candidato reprovado).
+    """
+    if versao == versao_atual(nome, diretorio):
+        raise ValueError(f"A versão {versao} de {nome} está em uso; ative outra antes de removê-la.")
+    shutil.rmtree(os.path.join(diretorio, nome, versao), ignore_errors=True)
+
+
+def carregar_versao(nome, versao=None, legado=None, diretorio=REGISTRY_DIR):
+    """
+    Carrega uma versão (padrão: a em uso) com mmap_mode="r": os arrays
+    NumPy do bundle são mapeados do arquivo, somente leitura, e vários
+    processos (workers do uvicorn, pool de scoring) compartilham as
+    mesmas páginas do page cache em vez de uma cópia cada.
+
+    Se o registro ainda não tem versão ativa, usa o arquivo joblib
+    antigo em legado (versao="legado").
+    """
+    versao = versao or versao_atual(nome, diretorio)
+    if versao is None:
+        if legado and os.path.exists(legado):
+            bundle = joblib.load(legado, mmap_mode="r")
+            encoder = bundle.get("label_encoder")
+            label_map = {i: str(c) for i, c in enumerate(encoder.classes_)} if encoder is not None else {}
+            return ModeloAtivo(bundle["model"], tuple(bundle["features"]), label_map, "legado", {"origem": legado})
+        raise FileNotFoundError(f"Nenhuma versão de {nome} ativa em {diretorio} (e nenhum arquivo legado).")
+
+    pasta = os.path.join(diretorio, nome, versao)
+    with open(os.path.join(pasta, _METADADOS), encoding="utf-8") as f:
+        metadados = json.load(f)
+    bundle = joblib.load(os.path.join(pasta, _BUNDLE), mmap_mode="r")
+    label_map = {int(k): v for k, v in metadados["label_map"].items()}
+
+    # A floresta compilada é só arrays NumPy: com mmap, fica inteira no page cache compartilhado
+    caminho_compilado = os.path.join(pasta, "compilado.joblib")
+    compilado = joblib.load(caminho_compilado, mmap_mode="r") if os.path.exists(caminho_compilado) else None
+    return ModeloAtivo(bundle["model"], tuple(metadados["features"]), label_map, versao, metadados, compilado)
+
+
+def importar_legado(nome, caminho, ativar=True, diretorio=REGISTRY_DIR):
+    """
+    Registra um bundle joblib antigo (models/course_model*.joblib) como versão.
+    """
+    bundle = joblib.load(caminho)
+    encoder = bundle.get("label_encoder")
+    label_map = {i: str(c) for i, c in enumerate(encoder.classes_)} if encoder is not None else None
+    return registrar_modelo(nome, bundle, label_map=label_map, metricas={"origem": caminho}, ativar=ativar,
+                            diretorio=diretorio)
+
+
+# ============================================================
+# 🔹 Execução direta (listar, ativar, rollback, importar)
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registro de modelos versionados")
+    parser.add_argument("--registro", default=REGISTRY_DIR, help="diretório do registro")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    cmd = comandos.add_parser("listar", help="lista as versões de um modelo")
+    cmd.add_argument("nome")
+    cmd = comandos.add_parser("ativar", help="passa a usar uma versão")
+    cmd.add_argument("nome")
+    cmd.add_argument("versao")
+    cmd = comandos.add_parser("rollback", help="volta para a versão anterior à em uso")
+    cmd.add_argument("nome")
+    cmd = comandos.add_parser("importar", help="registra um arquivo joblib antigo")
+    cmd.add_argument("nome")
+    cmd.add_argument("caminho")
+    cmd.add_argument("--sem-ativar", action="store_true")
+    args = parser.parse_args()
+
+    if args.comando == "listar":
+        atual = versao_atual(args.nome, args.registro)
+        for m in listar_versoes(args.nome, args.registro):
+            marca = "👉" if m["versao"] == atual else "  "
+            metricas = {k: v for k, v in m["metricas"].items() if k not in ("importance", "params")}
+            print(f"{marca} {m['versao']}  {m['criado_em']}  dados={str(m['dados_hash'])[:12]}  {metricas}")
+    elif args.comando == "ativar":
+        ativar_versao(args.nome, args.versao, args.registro)
+    elif args.comando == "rollback":
+        rollback(args.nome, args.registro)
+    else:
+        importar_legado(args.nome, args.caminho, ativar=not args.sem_ativar, diretorio=args.registro)
@@ -1,44 +1,110 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 import pandas as pd
-import joblib
 import numpy as np
 import traceback
-import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
-from models.train import train_model  # ✅ Função de treino
+from utils.catalogo import (
+    carregar_cursos, compilar_catalogo, probs_por_area, colunas_por_area, expandir_cursos, top_k,
+    cursos_recomendados
+)
+from models.train import treinar_em_processo, NOME_MODELO  # ✅ Função de treino
+from models.compilado import prever
+from utils.lote import responder_lote
+from models.registry import carregar_versao, versao_atual, ativar_versao, remover_versao
 
 # ============================================================
 # 🚀 Inicialização da API
 # ============================================================
-app = FastAPI(title="SmartTeaching Prediction Service")
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    yield
+    # Um treino em andamento é interrompido (o job fica como "falhou"): o processo
+    # filho é terminado, então o desligamento não espera o fim do treino (ver seção 7)
+    if _treino is not None and _treino.is_alive():
+        _treino.terminate()
+        _treino.join(timeout=5)
+        if _treino.is_alive():
+            _treino.kill()
+
+
+app = FastAPI(title="SmartTeaching Prediction Service", lifespan=ciclo_de_vida)
 
 # ============================================================
 # 1️⃣ Carregamento do modelo
 # ============================================================
+# Arquivo antigo, usado só enquanto o registro não tem versão ativa
 MODEL_PATH = "models/course_model.joblib"
 
+# A cada quantos segundos o ponteiro de versão do registro é conferido
+# (ativar/rollback em models.registry chega a todos os workers)
+VERIFICAR_REGISTRO_S = float(os.getenv("REGISTRY_VERIFICAR_S", "1"))
+
 try:
-    model_bundle = joblib.load(MODEL_PATH)
-    model = model_bundle["model"]
-    feature_names = model_bundle["features"]
-    print(f"✅ Modelo carregado com features: {feature_names}")
+    _ativo = carregar_versao(NOME_MODELO, legado=MODEL_PATH)
+    print(f"✅ Modelo {_ativo.versao} carregado com features: {list(_ativo.features)}")
 except Exception as e:
     print(f"❌ Erro ao carregar modelo: {e}")
-    model, feature_names = None, []
+    _ativo = None
+
+_troca_lock = threading.Lock()
+_verificado_em = time.monotonic()
+
+
+def modelo_em_uso():
+    """
+    Modelo ativo para a requisição. Se outra versão foi ativada no
+    registro (novo treino, ativar ou rollback), carrega, valida e troca
+    a referência; se a versão nova falhar, continua com a atual.
+    """
+    global _ativo, _verificado_em
+    agora = time.monotonic()
+    if agora - _verificado_em < VERIFICAR_REGISTRO_S:
+        return _ativo
+    _verificado_em = agora
+
+    versao = versao_atual(NOME_MODELO)
+    if versao is None or (_ativo is not None and _ativo.versao == versao):
+        return _ativo
+
+    with _troca_lock:
+        if _ativo is None or _ativo.versao != versao:
+            try:
+                novo = carregar_versao(NOME_MODELO, versao)
+                validar_modelo(novo)
+                _ativo = novo
+                print(f"🔄 Modelo trocado para a versão {versao}")
+            except Exception as e:
+                print(f"❌ Versão {versao} não pôde ser carregada, mantendo a atual: {e}")
+    return _ativo
+
 
 # ============================================================
 # 2️⃣ Carregamento dinâmico dos cursos
 # ============================================================
 COURSES_PATH = Path("data/courses.json")
 try:
-    with open(COURSES_PATH, "r", encoding="utf-8") as f:
-        COURSES = json.load(f)
+    COURSES = carregar_cursos(COURSES_PATH)
     print(f"✅ {len(COURSES)} cursos carregados de {COURSES_PATH}")
 except Exception as e:
     print(f"❌ Erro ao carregar cursos: {e}")
     COURSES = []
 
+# 🔹 Catálogo compilado uma vez: a recomendação vira operações sobre arrays
+AREA_INDEX_MAP = {"Humanas": 0, "Exatas": 1, "Biológicas": 2, "Negócios": 0}
+CATALOGO = compilar_catalogo(COURSES, AREA_INDEX_MAP)
+
+# Peso do perfil vocacional por área (0 para áreas fora da tabela)
+PESO_VOCACIONAL = {"Exatas": 0.8, "Humanas": 1.0, "Biológicas": 0.9, "Negócios": 0.95}
+PESO_VOCACIONAL_AREA = np.array([PESO_VOCACIONAL.get(area, 0.0) for area in CATALOGO["areas"]])
+
 # ============================================================
 # 3️⃣ Schema de entrada (payload esperado)
 # ============================================================
@@ -54,105 +120,110 @@ class PredictionRequest(BaseModel):
     perfil_vocacional: float
 
 
+# Campo do payload correspondente a cada feature do modelo
+CAMPOS_FEATURES = {
+    "media_exatas": "media_exatas",
+    "media_humanas": "media_humanas",
+    "media_biologicas": "media_biologicas",
+    "E/I": "E_I",
+    "S/N": "S_N",
+    "T/F": "T_F",
+    "J/P": "J_P",
+    "perfil_mbti": "perfil_mbti",
+    "perfil_vocacional": "perfil_vocacional",
+}
+
+
 # ============================================================
-# 4️⃣ Endpoint principal de predição
+# 4️⃣ Predição vetorizada (um ou vários alunos)
 # ============================================================
-@app.post("/predict")
-def predict(data: PredictionRequest):
-    print("📩 Payload recebido:", data.dict())
+def recomendar_lote(registros, ativo=None):
+    """
+    Prediz e recomenda cursos para vários alunos de uma vez: uma única
+    chamada a predict_proba para a matriz inteira e o score de todos os
+    cursos calculado com NumPy. Os resultados seguem a ordem de entrada.
 
-    if model is None:
-        raise HTTPException(status_code=500, detail="Modelo não carregado.")
+    Usa o modelo ativo no momento da chamada do começo ao fim, mesmo que
+    um re-treino o substitua no meio do lote.
+    """
+    if not registros:
+        return []
 
-    try:
-        # 🔹 Monta o dicionário completo com todas as features esperadas
-        input_data = {
-            "media_exatas": data.media_exatas,
-            "media_humanas": data.media_humanas,
-            "media_biologicas": data.media_biologicas,
-            "E/I": getattr(data, "E_I", 3.0),
-            "S/N": getattr(data, "S_N", 3.0),
-            "T/F": getattr(data, "T_F", 3.0),
-            "J/P": getattr(data, "J_P", 3.0),
-            "perfil_mbti": data.perfil_mbti,
-            "perfil_vocacional": data.perfil_vocacional
-        }
+    ativo = ativo or modelo_em_uso()
+    feature_names = list(ativo.features)
 
-        # 🔹 Garante a ordem das colunas igual ao treino do modelo
-        X = pd.DataFrame([[input_data[col] for col in feature_names]], columns=feature_names)
-
-        # 🔹 Predição principal
-        pred_label = int(model.predict(X)[0])
-
-        # 🔹 Obtém probabilidades de cada classe
-        if hasattr(model.named_steps["clf"], "predict_proba"):
-            probs = model.named_steps["clf"].predict_proba(X)[0]
-        else:
-            probs = np.zeros(len(set(model.named_steps["clf"].classes_)))
-            probs[pred_label] = 1.0
-
-        # ============================================================
-        # 🎓 Mapeamento de afinidade MBTI / Vocacional por área
-        # ============================================================
-        afinidade_mbti = {
-            "Exatas": data.perfil_mbti / 5,
-            "Humanas": 1 - abs(data.perfil_mbti - 2.5) / 5,
-            "Biológicas": abs(data.perfil_mbti - 3.5) / 5,
-            "Negócios": data.perfil_mbti / 4.5
-        }
+    # 🔹 Matriz de features na mesma ordem de colunas do treino
+    X = pd.DataFrame(
+        [[getattr(r, CAMPOS_FEATURES[col]) for col in feature_names] for r in registros],
+        columns=feature_names, dtype=float
+    )
+
+    # 🔹 Rótulo e probabilidades numa só passada (floresta compilada ou pipeline completo)
+    pred_labels, probs = prever(ativo, X)
 
-        afinidade_vocacional = {
-            "Exatas": (data.perfil_vocacional * 0.8) / 5,
-            "Humanas": (data.perfil_vocacional * 1.0) / 5,
-            "Biológicas": (data.perfil_vocacional * 0.9) / 5,
-            "Negócios": (data.perfil_vocacional * 0.95) / 5
+    scores = pontuar_cursos(X, probs)
+    top = top_k(scores)
+    recomendados = cursos_recomendados(CATALOGO, scores, top)
+
+    return [
+        {
+            "PredictedLabel": int(pred_labels[i]),
+            "Probability": float(probs[i].max()),
+            "CursosRecomendados": recomendados[i]
         }
+        for i in range(len(registros))
+    ]
 
-        area_index_map = {"Humanas": 0, "Exatas": 1, "Biológicas": 2, "Negócios": 0}
-
-        resultados = []
-        for curso in COURSES:
-            area = curso["area"]
-            nome = curso["nome"]
-
-            idx = area_index_map.get(area.split("/")[0], 0)
-            base_score = probs[min(idx, len(probs) - 1)]
-
-            # 🔹 Ajuste com base na média por área
-            if area == "Exatas":
-                media_area = data.media_exatas
-            elif area == "Humanas":
-                media_area = data.media_humanas
-            elif area == "Biológicas":
-                media_area = data.media_biologicas
-            else:
-                media_area = (data.media_exatas + data.media_humanas + data.media_biologicas) / 3
-
-            media_norm = media_area / 10
-
-            # 🔹 Cálculo ponderado final
-            score_final = (
-                (base_score * 0.5)
-                + (afinidade_mbti.get(area, 0.0) * 0.2)
-                + (afinidade_vocacional.get(area, 0.0) * 0.1)
-                + (media_norm * 0.2)
-            )
-
-            score_final *= np.random.uniform(0.97, 1.03)
-
-            resultados.append({
-                "nome": nome,
-                "area": area,
-                "score": round(float(score_final), 3)
-            })
 
-        resultados = sorted(resultados, key=lambda x: x["score"], reverse=True)[:10]
+def pontuar_cursos(X, probs):
+    """
+    Score (alunos × cursos), arredondado em 3 casas, combinando a
+    probabilidade da área, afinidades MBTI/vocacional e a média escolar.
+    Tudo é calculado por área e só no fim expandido para os cursos.
+    """
+    mbti = X["perfil_mbti"].to_numpy()
+    vocacional = X["perfil_vocacional"].to_numpy()
+    exatas, humanas, biologicas = (X[c].to_numpy() for c in ("media_exatas", "media_humanas", "media_biologicas"))
 
-        return {
-            "PredictedLabel": pred_label,
-            "Probability": float(max(probs)),
-            "CursosRecomendados": resultados
-        }
+    # ============================================================
+    # 🎓 Mapeamento de afinidade MBTI / Vocacional por área
+    # ============================================================
+    afinidade_mbti = {
+        "Exatas": mbti / 5,
+        "Humanas": 1 - np.abs(mbti - 2.5) / 5,
+        "Biológicas": np.abs(mbti - 3.5) / 5,
+        "Negócios": mbti / 4.5
+    }
+    afinidade_vocacional = (vocacional[:, None] * PESO_VOCACIONAL_AREA) / 5
+
+    media_area = {"Exatas": exatas, "Humanas": humanas, "Biológicas": biologicas}
+    media_geral = (exatas + humanas + biologicas) / 3
+
+    # 🔹 Cálculo ponderado final
+    score_area = (
+        (probs_por_area(CATALOGO, probs) * 0.5)
+        + (colunas_por_area(CATALOGO, afinidade_mbti, np.zeros(len(X))) * 0.2)
+        + (afinidade_vocacional * 0.1)
+        + (colunas_por_area(CATALOGO, media_area, media_geral) / 10 * 0.2)
+    )
+
+    scores = expandir_cursos(CATALOGO, score_area) * np.random.uniform(0.97, 1.03, size=(len(X), len(COURSES)))
+    return np.round(scores, 3)
+
+
+# ============================================================
+# 5️⃣ Endpoint principal de predição
+# ============================================================
+@app.post("/predict")
+def predict(data: PredictionRequest):
+    print("📩 Payload recebido:", data.dict())
+
+    ativo = modelo_em_uso()
+    if ativo is None:
+        raise HTTPException(status_code=500, detail="Modelo não carregado.")
+
+    try:
+        return recomendar_lote([data], ativo)[0]
 
     except Exception as e:
         print("❌ Erro interno no modelo:", traceback.format_exc())
@@ -160,26 +231,157 @@ def predict(data: PredictionRequest):
 
 
 # ============================================================
-# 5️⃣ Endpoint de re-treinamento
+# 6️⃣ Predição em lote (array JSON ou NDJSON)
 # ============================================================
-@app.post("/train")
-def retrain_model():
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    ativo = modelo_em_uso()
+    if ativo is None:
+        raise HTTPException(status_code=500, detail="Modelo não carregado.")
+    # 🔹 Responde no mesmo formato recebido, na mesma ordem
+    return await responder_lote(request, PredictionRequest, recomendar_lote, ativo)
+
+
+# ============================================================
+# 7️⃣ Re-treinamento em segundo plano
+# ============================================================
+# Prioridade (nice) do processo de treino: as predições passam na frente
+TREINO_NICE = int(os.getenv("TREINO_NICE", "10"))
+
+_treino = None  # processo do treino em andamento (um job por vez)
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _iniciar_treino(job_id):
+    """
+    Roda o treino em um processo novo (spawn: não herda threads nem
+    conexões do servidor), então a memória do treino é devolvida ao
+    sistema quando ele termina e um processo morto (ex.: OOM kill) não
+    afeta o próximo job. Uma thread espera o resultado.
+    """
+    global _treino
+    contexto = multiprocessing.get_context("spawn")
+    receptor, emissor = contexto.Pipe(duplex=False)
+    # O treino registra uma versão nova sem ativá-la; ela só entra em uso depois da validação
+    processo = contexto.Process(target=treinar_em_processo, args=(emissor,),
+                                kwargs={"nice": TREINO_NICE, "ativar": False}, name=f"treino-{job_id[:8]}")
+    processo.start()
+    # Só o filho escreve: se ele morrer, recv() no servidor recebe EOFError
+    emissor.close()
+    _treino = processo
+    threading.Thread(target=_concluir_treino, args=(job_id, processo, receptor), daemon=True).start()
+
+
+def _receber_resultado(processo, receptor):
+    """
+    Resultado de train_model enviado pelo processo de treino. Levanta
+    RuntimeError se o treino falhou ou se o processo morreu sem responder.
+    """
+    try:
+        status, valor = receptor.recv()
+    except EOFError:
+        status, valor = "erro", None
+    finally:
+        receptor.close()
+        processo.join()
+    if status != "ok":
+        raise RuntimeError(valor or f"O processo de treino terminou sem resultado (código {processo.exitcode}).")
+    return valor
+
+
+def validar_modelo(ativo):
+    """
+    Confere o modelo recém-treinado antes de colocá-lo em uso: as
+    features precisam existir no payload e predict_proba precisa
+    devolver uma distribuição válida por aluno.
+    """
+    desconhecidas = [col for col in ativo.features if col not in CAMPOS_FEATURES]
+    if desconhecidas:
+        raise ValueError(f"Features sem campo correspondente no payload: {desconhecidas}")
+
+    X = pd.DataFrame(np.zeros((2, len(ativo.features))), columns=list(ativo.features))
+    probs = ativo.model.predict_proba(X)
+    if probs.shape != (2, len(ativo.model.classes_)) or not np.allclose(probs.sum(axis=1), 1):
+        raise ValueError(f"predict_proba devolveu probabilidades inválidas: {probs}")
+
+
+def _atualizar_job(job_id, **campos):
+    with _jobs_lock:
+        _jobs[job_id].update(campos)
+
+
+def _concluir_treino(job_id, processo, receptor):
+    """
+    Espera o processo de treino terminar, valida a versão candidata
+    (registrada sem ativar) e, só então, ativa-a no registro e troca o
+    modelo em uso em uma única atribuição.
+    """
+    global _ativo
+    versao = None
     try:
-        print("🔁 Iniciando re-treinamento do modelo...")
-        result = train_model(MODEL_PATH)
-
-        global model, feature_names
-        model_bundle = joblib.load(MODEL_PATH)
-        model = model_bundle["model"]
-        feature_names = model_bundle["features"]
-
-        print("✅ Novo modelo carregado com sucesso!")
-        return {
-            "message": "Modelo reentreinado com sucesso.",
-            "score": result["score"],
-            "importance": result["importance"]
+        result = _receber_resultado(processo, receptor)
+        versao = result["versao"]
+        _atualizar_job(job_id, status="validando", versao=versao)
+
+        novo = carregar_versao(NOME_MODELO, versao)
+        validar_modelo(novo)
+        with _troca_lock:
+            ativar_versao(NOME_MODELO, versao)
+            _ativo = novo
+
+        print(f"✅ Job {job_id}: versão {versao} em uso (acurácia {result['score']:.3f})")
+        _atualizar_job(
+            job_id, status="concluido", concluido_em=datetime.now().isoformat(timespec="seconds"),
+            message="Modelo reentreinado com sucesso.", score=result["score"], avaliacao=result["avaliacao"],
+            importance=result["importance"], classes=novo.label_map
+        )
+    except Exception as e:
+        print(f"❌ Job {job_id}: erro no re-treinamento:", traceback.format_exc())
+        _atualizar_job(job_id, status="falhou", concluido_em=datetime.now().isoformat(timespec="seconds"),
+                       erro=str(e))
+        if versao is not None:
+            remover_versao(NOME_MODELO, versao)
+
+
+@app.post("/train", status_code=202)
+def retrain_model():
+    """
+    Dispara o re-treino em um processo separado e responde na hora com o
+    id do job; o andamento é consultado em GET /train/{job_id}. As
+    predições continuam usando o modelo atual até o novo ser validado.
+    """
+    with _jobs_lock:
+        em_andamento = [job for job in _jobs.values() if job["status"] in ("treinando", "validando")]
+        if em_andamento:
+            raise HTTPException(status_code=409, detail={
+                "message": "Já existe um re-treinamento em andamento.",
+                "job_id": em_andamento[0]["job_id"],
+            })
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "status": "treinando",
+            "iniciado_em": datetime.now().isoformat(timespec="seconds"),
+            "concluido_em": None,
         }
 
+    print(f"🔁 Job {job_id}: iniciando re-treinamento do modelo...")
+    try:
+        _iniciar_treino(job_id)
     except Exception as e:
-        print("❌ Erro no re-treinamento:", traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        _atualizar_job(job_id, status="falhou", concluido_em=datetime.now().isoformat(timespec="seconds"),
+                       erro=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"job_id": job_id, "status": "treinando", "status_url": f"/train/{job_id}"}
+
+
+@app.get("/train/{job_id}")
+def train_status(job_id: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job de treino não encontrado.")
+        return dict(job)
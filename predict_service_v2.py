@@ -1,12 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-import pandas as pd
-import joblib
 import numpy as np
 import traceback
-import json
+import os
+import threading
+import time
 from pathlib import Path
+from utils.catalogo import (
+    carregar_cursos, compilar_catalogo, probs_por_area, colunas_por_area, expandir_cursos, top_k,
+    cursos_recomendados
+)
 from sklearn.preprocessing import StandardScaler
+from models.compilado import prever
+from utils.lote import responder_lote
+from models.registry import carregar_versao, versao_atual
 
 # ============================================================
 # 🚀 Inicialização da API
@@ -16,29 +23,68 @@ app = FastAPI(title="SmartTeaching Prediction Service v2")
 # ============================================================
 # 1️⃣ Carregamento do modelo otimizado
 # ============================================================
+# Nome no registro de modelos; o arquivo antigo só é usado enquanto o registro não tem versão ativa
+NOME_MODELO = "course_model_v2"
 MODEL_PATH = "models/course_model_v2.joblib"
 
+# A cada quantos segundos o ponteiro de versão do registro é conferido
+VERIFICAR_REGISTRO_S = float(os.getenv("REGISTRY_VERIFICAR_S", "1"))
+
 try:
-    model_bundle = joblib.load(MODEL_PATH)
-    model = model_bundle["model"]
-    feature_names = model_bundle["features"]
-    print(f"✅ Modelo v2 carregado com features: {feature_names}")
+    _ativo = carregar_versao(NOME_MODELO, legado=MODEL_PATH)
+    print(f"✅ Modelo v2 {_ativo.versao} carregado com features: {list(_ativo.features)}")
 except Exception as e:
     print(f"❌ Erro ao carregar modelo: {e}")
-    model, feature_names = None, []
+    _ativo = None
+
+_troca_lock = threading.Lock()
+_verificado_em = time.monotonic()
+
+
+def modelo_em_uso():
+    """
+    Modelo ativo para a requisição. Se outra versão foi ativada no
+    registro (novo treino, ativar ou rollback), carrega e troca a
+    referência inteira; se a versão nova falhar, continua com a atual.
+    """
+    global _ativo, _verificado_em
+    agora = time.monotonic()
+    if agora - _verificado_em < VERIFICAR_REGISTRO_S:
+        return _ativo
+    _verificado_em = agora
+
+    versao = versao_atual(NOME_MODELO)
+    if versao is None or (_ativo is not None and _ativo.versao == versao):
+        return _ativo
+
+    with _troca_lock:
+        if _ativo is None or _ativo.versao != versao:
+            try:
+                novo = carregar_versao(NOME_MODELO, versao)
+                if list(novo.features) != COLUNAS_MATRIZ:
+                    raise ValueError(f"features {list(novo.features)} incompatíveis com o payload")
+                _ativo = novo
+                print(f"🔄 Modelo v2 trocado para a versão {versao}")
+            except Exception as e:
+                print(f"❌ Versão {versao} não pôde ser carregada, mantendo a atual: {e}")
+    return _ativo
+
 
 # ============================================================
 # 2️⃣ Carregamento dinâmico dos cursos
 # ============================================================
 COURSES_PATH = Path("data/courses.json")
 try:
-    with open(COURSES_PATH, "r", encoding="utf-8") as f:
-        COURSES = json.load(f)
+    COURSES = carregar_cursos(COURSES_PATH)
     print(f"✅ {len(COURSES)} cursos carregados de {COURSES_PATH}")
 except Exception as e:
     print(f"❌ Erro ao carregar cursos: {e}")
     COURSES = []
 
+# 🔹 Catálogo compilado uma vez: a recomendação vira operações sobre arrays
+AREA_INDEX_MAP = {"Biológicas": 0, "Exatas": 1, "Humanas": 2, "Negócios": 3}
+CATALOGO = compilar_catalogo(COURSES, AREA_INDEX_MAP)
+
 # ============================================================
 # 3️⃣ Schema de entrada (payload esperado)
 # ============================================================
@@ -55,97 +101,131 @@ class PredictionRequest(BaseModel):
 
 
 # ============================================================
-# 4️⃣ Função auxiliar para gerar features adicionais
+# 4️⃣ Features adicionais (calculadas por coluna)
 # ============================================================
-def compute_extra_features(data: PredictionRequest):
-    media_global = np.mean([data.media_exatas, data.media_humanas, data.media_biologicas])
-    dif_exatas_humanas = round(data.media_exatas - data.media_humanas, 3)
-    dif_exatas_bio = round(data.media_exatas - data.media_biologicas, 3)
-    dif_humanas_bio = round(data.media_humanas - data.media_biologicas, 3)
+def features_extras(exatas, humanas, biologicas):
+    """
+    Features derivadas das médias (arrays, um valor por aluno): média
+    global e diferenças entre áreas, como em montar_features do treino.
+    Retorna (media_global, dif_exatas_humanas, dif_exatas_bio, dif_humanas_bio).
+    """
+    media_global = (exatas + humanas + biologicas) / 3
+    dif_exatas_humanas = np.round(exatas - humanas, 3)
+    dif_exatas_bio = np.round(exatas - biologicas, 3)
+    dif_humanas_bio = np.round(humanas - biologicas, 3)
     return media_global, dif_exatas_humanas, dif_exatas_bio, dif_humanas_bio
 
 
+LABEL_MAP = {0: "Biológicas", 1: "Exatas", 2: "Humanas", 3: "Negócios"}
+
+
+# ============================================================
+# 5️⃣ Predição vetorizada (um ou vários alunos)
+# ============================================================
+# Campos do payload, na ordem em que entram na matriz
+CAMPOS_PAYLOAD = [
+    "media_exatas", "media_humanas", "media_biologicas",
+    "E_I", "S_N", "T_F", "J_P", "perfil_mbti", "perfil_vocacional"
+]
+
+# Colunas montadas por montar_matriz, na ordem do treino
+COLUNAS_MATRIZ = [
+    "media_exatas", "media_humanas", "media_biologicas",
+    "media_global", "dif_exatas_humanas", "dif_exatas_bio", "dif_humanas_bio",
+    "E/I", "S/N", "T/F", "J/P", "perfil_mbti", "perfil_vocacional"
+]
+
+
+def montar_matriz(registros):
+    """
+    Monta a matriz de features (alunos × COLUNAS_MATRIZ, com as
+    features_extras) direto em NumPy, sem passar por um DataFrame.
+    """
+    dados = np.array([[getattr(r, campo) for campo in CAMPOS_PAYLOAD] for r in registros], dtype=float)
+    exatas, humanas, biologicas = dados[:, 0], dados[:, 1], dados[:, 2]
+    return np.column_stack([
+        exatas, humanas, biologicas,
+        *features_extras(exatas, humanas, biologicas),
+        dados[:, 3:],
+    ])
+
+
+def recomendar_lote(registros, ativo=None):
+    """
+    Prediz e recomenda cursos para vários alunos de uma vez: uma única
+    chamada a predict_proba para a matriz inteira e o score de todos os
+    cursos calculado com NumPy. Os resultados seguem a ordem de entrada.
+    Usa um único modelo do começo ao fim, mesmo que a versão mude no meio.
+    """
+    if not registros:
+        return []
+
+    ativo = ativo or modelo_em_uso()
+    label_map = ativo.label_map or LABEL_MAP
+
+    X = montar_matriz(registros)
+
+    # 🔹 Rótulo (classe mais provável, = model.predict) e probabilidades numa só passada
+    pred_labels, probs = prever(ativo, X)
+    prob_max = probs.max(axis=1)
+
+    scores = pontuar_cursos(X, probs, prob_max)
+    top = top_k(scores)
+    recomendados = cursos_recomendados(CATALOGO, scores, top)
+
+    return [
+        {
+            "PredictedLabel": label_map.get(int(pred_labels[i]), "Desconhecido"),
+            "Confidence": round(float(prob_max[i]), 3),
+            "CursosRecomendados": recomendados[i]
+        }
+        for i in range(len(registros))
+    ]
+
+
+def pontuar_cursos(X, probs, prob_max):
+    """
+    Score (alunos × cursos), arredondado em 3 casas, combinando a
+    probabilidade da área, a média escolar na área e a confiança.
+    Tudo é calculado por área e só no fim expandido para os cursos.
+    """
+    # ============================================================
+    # 🎓 Mapeamento de recomendação de cursos
+    # ============================================================
+    coluna = dict(zip(COLUNAS_MATRIZ, X.T))
+    media_area = {
+        "Exatas": coluna["media_exatas"],
+        "Humanas": coluna["media_humanas"],
+        "Biológicas": coluna["media_biologicas"],
+    }
+
+    score_area = (
+        probs_por_area(CATALOGO, probs) * 0.6
+        + colunas_por_area(CATALOGO, media_area, coluna["media_global"]) / 10 * 0.3
+        + prob_max[:, None] * 0.1
+    )
+
+    scores = expandir_cursos(CATALOGO, score_area) * np.random.uniform(0.98, 1.02, size=(len(X), len(COURSES)))
+    return np.round(scores, 3)
+
+
 # ============================================================
-# 5️⃣ Endpoint principal de predição
+# 6️⃣ Endpoint principal de predição
 # ============================================================
 @app.post("/predict")
 def predict(data: PredictionRequest):
     print("📩 Payload recebido:", data.dict())
 
-    if model is None:
+    ativo = modelo_em_uso()
+    if ativo is None:
         raise HTTPException(status_code=500, detail="Modelo não carregado.")
 
     try:
-        media_global, dif_exatas_humanas, dif_exatas_bio, dif_humanas_bio = compute_extra_features(data)
-
-        # 🔹 Monta o dataframe de entrada
-        X = pd.DataFrame([[
-            data.media_exatas,
-            data.media_humanas,
-            data.media_biologicas,
-            media_global,
-            dif_exatas_humanas,
-            dif_exatas_bio,
-            dif_humanas_bio,
-            data.E_I,
-            data.S_N,
-            data.T_F,
-            data.J_P,
-            data.perfil_mbti,
-            data.perfil_vocacional
-        ]], columns=feature_names)
-
-        # 🔹 Predição principal
-        pred_label = int(model.predict(X)[0])
-        label_map = {0: "Biológicas", 1: "Exatas", 2: "Humanas", 3: "Negócios"}
-        label_text = label_map.get(pred_label, "Desconhecido")
-
-        # 🔹 Probabilidade por classe
-        probs = model.predict_proba(X)[0]
-        prob_max = float(np.max(probs))
+        resultado = recomendar_lote([data], ativo)[0]
 
         # 🔹 Log da predição
-        print(f"🎯 Predição: {label_text} (confiança: {prob_max:.3f})")
-
-        # ============================================================
-        # 🎓 Mapeamento de recomendação de cursos
-        # ============================================================
-        area_index_map = {"Biológicas": 0, "Exatas": 1, "Humanas": 2, "Negócios": 3}
-        resultados = []
-
-        for curso in COURSES:
-            area = curso["area"]
-            nome = curso["nome"]
-
-            idx = area_index_map.get(area.split("/")[0], 0)
-            base_score = probs[min(idx, len(probs) - 1)]
-
-            media_area = (
-                data.media_exatas if area == "Exatas" else
-                data.media_humanas if area == "Humanas" else
-                data.media_biologicas if area == "Biológicas" else
-                media_global
-            )
-
-            score_final = (
-                base_score * 0.6
-                + (media_area / 10) * 0.3
-                + (prob_max) * 0.1
-            ) * np.random.uniform(0.98, 1.02)
-
-            resultados.append({
-                "nome": nome,
-                "area": area,
-                "score": round(float(score_final), 3)
-            })
-
-        resultados = sorted(resultados, key=lambda x: x["score"], reverse=True)[:10]
-
-        return {
-            "PredictedLabel": label_text,
-            "Confidence": round(prob_max, 3),
-            "CursosRecomendados": resultados
-        }
+        print(f"🎯 Predição: {resultado['PredictedLabel']} (confiança: {resultado['Confidence']:.3f})")
+        return resultado
 
     except Exception as e:
         print("❌ Erro interno no modelo:", traceback.format_exc())
@@ -153,8 +233,23 @@ def predict(data: PredictionRequest):
 
 
 # ============================================================
-# 6️⃣ Health-check simples
+# 7️⃣ Predição em lote (array JSON ou NDJSON)
+# ============================================================
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    ativo = modelo_em_uso()
+    if ativo is None:
+        raise HTTPException(status_code=500, detail="Modelo não carregado.")
+    # 🔹 Responde no mesmo formato recebido, na mesma ordem
+    return await responder_lote(request, PredictionRequest, recomendar_lote, ativo)
+
+
+# ============================================================
+# 8️⃣ Health-check simples
 # ============================================================
 @app.get("/health")
 def health():
-    return {"status": "ok", "modelo": "v2", "features": feature_names}
\ No newline at end of file
+    ativo = modelo_em_uso()
+    if ativo is None:
+        return {"status": "sem modelo", "modelo": "v2", "versao": None, "features": []}
+    return {"status": "ok", "modelo": "v2", "versao": ativo.versao, "features": list(ativo.features)}
\ No newline at end of file
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from utils.catalogo import top_k
+
+# ============================================================
+# 🔹 top_k × ordenação estável (empates na ordem do catálogo)
+# ============================================================
+
+
+def _esperado(scores, k):
+    return np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+
+@pytest.mark.parametrize("k", [1, 3, 10, 39, 40, 50])
+def test_empates_no_corte(k):
+    # Poucos valores distintos: quase todo corte cai no meio de um empate
+    rng = np.random.default_rng(0)
+    scores = np.round(rng.integers(0, 4, size=(500, 40)) * 0.1, 3)
+    np.testing.assert_array_equal(top_k(scores, k), _esperado(scores, k))
+
+
+@pytest.mark.parametrize("k", [1, 5, 12])
+def test_linhas_todas_empatadas_ou_distintas(k):
+    scores = np.vstack([
+        np.full(12, 0.5),
+        np.arange(12, dtype=float),
+        np.arange(12, dtype=float)[::-1],
+        np.r_[np.full(6, 0.7), np.full(6, 0.9)],
+    ])
+    np.testing.assert_array_equal(top_k(scores, k), _esperado(scores, k))
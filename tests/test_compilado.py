@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+import models.compilado as compilado_mod
+from models.compilado import LIMITE_PASSOS, LINHAS_POR_BLOCO, TOLERANCIA, avaliar, compilar_pipeline, prever
+from models.registry import ModeloAtivo
+
+# ============================================================
+# 🔹 Paridade da floresta compilada com o pipeline do sklearn
+#    (sem registro nem banco: o modelo é treinado em dados sintéticos)
+# ============================================================
+FEATURES = ["f0", "f1", "f2", "f3", "f4", "f5"]
+
+
+def _linhas(rng, n):
+    # Arredondadas em 0.1, como as notas e escalas do payload: muitos valores caem exatamente nos limiares
+    return pd.DataFrame(np.round(rng.normal(5, 2, size=(n, len(FEATURES))), 1), columns=FEATURES)
+
+
+@pytest.fixture(scope="module")
+def pipe():
+    rng = np.random.default_rng(0)
+    X = _linhas(rng, 600)
+    ruido = rng.normal(0, 1, len(X))
+    y = (X["f0"] + X["f1"] - X["f2"] + ruido > 8).astype(int) + (X["f3"] > 6)
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0)),
+    ]).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def compilado(pipe):
+    return compilar_pipeline(pipe)
+
+
+def _conferir(pipe, compilado, X):
+    labels, probs = avaliar(compilado, X)
+    probs_sklearn = pipe.predict_proba(X)
+    assert probs.shape == probs_sklearn.shape
+    np.testing.assert_array_equal(labels, pipe.classes_[probs_sklearn.argmax(axis=1)])
+    if len(X):
+        assert np.abs(probs - probs_sklearn).max() <= TOLERANCIA
+
+
+def test_paridade_dados_de_treino(pipe, compilado):
+    _conferir(pipe, compilado, _linhas(np.random.default_rng(0), 600))
+
+
+def test_paridade_linhas_novas(pipe, compilado):
+    _conferir(pipe, compilado, _linhas(np.random.default_rng(1), 500))
+
+
+def test_paridade_varios_blocos(pipe, compilado):
+    _conferir(pipe, compilado, _linhas(np.random.default_rng(2), LINHAS_POR_BLOCO * 2 + 7))
+
+
+def test_uma_linha(pipe, compilado):
+    _conferir(pipe, compilado, _linhas(np.random.default_rng(3), 1))
+
+
+def test_zero_linhas(pipe, compilado):
+    labels, probs = avaliar(compilado, np.empty((0, len(FEATURES))))
+    assert labels.shape == (0,)
+    assert probs.shape == (0, len(pipe.classes_))
+
+
+def test_numero_de_colunas_errado(compilado):
+    with pytest.raises(ValueError):
+        avaliar(compilado, np.zeros((2, len(FEATURES) + 1)))
+
+
+def _ativo(pipe, compilado):
+    return ModeloAtivo(pipe, tuple(FEATURES), {}, "teste", {}, compilado)
+
+
+def test_prever_usa_compilado_em_lotes_pequenos(pipe, compilado, monkeypatch):
+    chamadas = []
+    original = compilado_mod.avaliar
+    monkeypatch.setattr(compilado_mod, "avaliar", lambda c, X: chamadas.append(len(X)) or original(c, X))
+
+    X = _linhas(np.random.default_rng(4), LIMITE_PASSOS // compilado["profundidade"])
+    labels, _ = prever(_ativo(pipe, compilado), X.to_numpy())
+    assert chamadas == [len(X)]
+    np.testing.assert_array_equal(labels, pipe.predict(X))
+
+
+def test_prever_usa_sklearn_acima_do_limite(pipe, compilado, monkeypatch):
+    def falhar(c, X):
+        raise AssertionError("a floresta compilada não deveria ser usada neste lote")
+
+    monkeypatch.setattr(compilado_mod, "avaliar", falhar)
+
+    X = _linhas(np.random.default_rng(5), LIMITE_PASSOS // compilado["profundidade"] + 1)
+    labels, probs = prever(_ativo(pipe, compilado), X.to_numpy())
+    np.testing.assert_array_equal(labels, pipe.predict(X))
+    np.testing.assert_array_equal(probs, pipe.predict_proba(X))
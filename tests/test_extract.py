@@ -0,0 +1,143 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from benchmarks.synthetic import gerar_alunos
+from etl.extract import extract_data_paginado, iter_json_array
+
+# ============================================================
+# 🔹 Decodificação incremental do array JSON (modo streaming)
+# ============================================================
+ELEMENTOS = [
+    {"id": 1, "nome": "João Conceição", "cidade": "São Paulo", "nota": -12.5e3, "ok": True, "x": None},
+    "texto com \"aspas\", vírgula, ] e \\ barra; emoji 🎓 e acentuação çãõé",
+    1234567890,
+    0.000125,
+    [1, [2, {"a": []}], "]"],
+    False,
+    None,
+    {},
+]
+CORPO = json.dumps(ELEMENTOS, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+def _em_blocos(dados, cortes):
+    cortes = [0, *sorted(cortes), len(dados)]
+    return [dados[a:b] for a, b in zip(cortes, cortes[1:])]
+
+
+def test_um_byte_por_bloco():
+    # Corta dentro de strings, números, literais e caracteres UTF-8 de vários bytes
+    assert list(iter_json_array(_em_blocos(CORPO, range(1, len(CORPO))))) == ELEMENTOS
+
+
+def test_todo_ponto_de_corte():
+    for corte in range(len(CORPO) + 1):
+        assert list(iter_json_array(_em_blocos(CORPO, [corte]))) == ELEMENTOS
+
+
+def test_cortes_aleatorios_e_blocos_vazios():
+    rng = random.Random(0)
+    for _ in range(200):
+        cortes = [rng.randint(0, len(CORPO)) for _ in range(rng.randint(1, 12))]
+        assert list(iter_json_array(_em_blocos(CORPO, cortes))) == ELEMENTOS
+
+
+def test_numero_no_fim_do_bloco_nao_e_cortado():
+    assert list(iter_json_array([b"[12", b"34, 5", b"6]"])) == [1234, 56]
+
+
+@pytest.mark.parametrize("blocos", [[b"[]"], [b"  [ \n ]  "], [b" ", b"[", b"", b" ", b"]"]])
+def test_array_vazio(blocos):
+    assert list(iter_json_array(blocos)) == []
+
+
+@pytest.mark.parametrize("corpo", [b"[1,", b"[1 2]", b"[1,]", b"[,1]", b"[1", b"[", b"", b"{}", b'["abc'])
+def test_json_malformado(corpo):
+    # JSONDecodeError também é ValueError
+    with pytest.raises(ValueError):
+        list(iter_json_array(_em_blocos(corpo, range(1, len(corpo)))))
+
+
+# ============================================================
+# 🔹 Extração paginada contra um servidor local no lugar da API
+#    (alunos sintéticos de benchmarks.synthetic)
+# ============================================================
+ALUNOS = list(gerar_alunos(1200, perguntas_mbti=4, perguntas_vocacionais=4))
+
+
+def _servidor(pagina_fn):
+    """
+    Sobe um servidor HTTP local; pagina_fn(page, page_size) devolve a
+    lista de alunos da resposta. Retorna (url, servidor).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            corpo = json.dumps(pagina_fn(int(query["page"][0]), int(query["pageSize"][0]))).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_port}/api/export/alunos-detalhados", servidor
+
+
+@pytest.fixture
+def servidor():
+    servidores = []
+
+    def subir(pagina_fn):
+        url, s = _servidor(pagina_fn)
+        servidores.append(s)
+        return url
+
+    yield subir
+    for s in servidores:
+        s.shutdown()
+        s.server_close()
+
+
+def _paginado(page, page_size):
+    return ALUNOS[(page - 1) * page_size:page * page_size]
+
+
+def test_paginas_em_ordem_sem_duplicar(servidor):
+    url = servidor(_paginado)
+    info = {}
+    alunos = list(extract_data_paginado(url, tamanho_pagina=100, max_workers=4, info=info))
+    assert [a["id"] for a in alunos] == [a["id"] for a in ALUNOS]
+    assert info["sha256"]
+
+
+@pytest.mark.parametrize("tamanho_pagina", [7, 400, 1200, 5000])
+def test_ultima_pagina_incompleta_ou_vazia(servidor, tamanho_pagina):
+    url = servidor(_paginado)
+    alunos = list(extract_data_paginado(url, tamanho_pagina=tamanho_pagina, max_workers=3))
+    assert len(alunos) == len(ALUNOS)
+
+
+def test_api_sem_paginacao(servidor):
+    # Como o /alunos-detalhados atual: toda "página" é o export inteiro
+    url = servidor(lambda page, page_size: ALUNOS)
+    with pytest.raises(ValueError, match="ignorou"):
+        list(extract_data_paginado(url, tamanho_pagina=500))
+
+
+def test_api_ignora_so_o_numero_da_pagina(servidor):
+    url = servidor(lambda page, page_size: ALUNOS[:page_size])
+    extraidos = []
+    with pytest.raises(ValueError, match="repete"):
+        for aluno in extract_data_paginado(url, tamanho_pagina=500):
+            extraidos.append(aluno)
+    assert len(extraidos) == 500
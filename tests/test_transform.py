@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import gerar_alunos
+from etl.extract import flatten_data
+from etl.schema import TABELAS_BRUTAS
+from etl.shard import transformar_em_shards
+from etl.transform import transformar_dados
+
+# ============================================================
+# 🔹 Transformação por lotes/shards × execução completa
+# ============================================================
+SEM_QUESTIONARIOS = {36, 37, 38, 39, 40}  # matriculados agora, ainda sem respostas
+
+
+def _alunos():
+    alunos = list(gerar_alunos(40, perguntas_mbti=8, perguntas_vocacionais=4))
+    for aluno in alunos:
+        if aluno["id"] in SEM_QUESTIONARIOS:
+            aluno["questionarios"] = []
+    return alunos
+
+
+def _transformar(alunos, **kwargs):
+    dfs = flatten_data(alunos)
+    return transformar_dados(*[dfs[t] for t in TABELAS_BRUTAS], **kwargs)
+
+
+def _juntar(partes, tabela):
+    return pd.concat([p[tabela] for p in partes], ignore_index=True).sort_values("aluno_id", ignore_index=True)
+
+
+def test_lote_sem_mbti_gera_perfil_vazio():
+    lote = [a for a in _alunos() if a["id"] in SEM_QUESTIONARIOS]
+    fatos = _transformar(lote, exigir_mbti=False)
+    assert fatos["fato_perfil"].empty
+    assert set(fatos["fato_historico"]["aluno_id"]) == SEM_QUESTIONARIOS
+
+    with pytest.raises(RuntimeError):
+        _transformar(lote)
+
+
+def test_lotes_iguais_a_execucao_completa():
+    alunos = _alunos()
+    # Um lote sem nenhuma pergunta de uma dimensão (J/P) e outro só de alunos sem questionários
+    for aluno in alunos[:10]:
+        for questionario in aluno["questionarios"]:
+            questionario["itens"] = [i for i in questionario["itens"] if i["pergunta"]["tipo"] != "J/P"]
+
+    completo = _transformar(alunos)
+    lotes = [_transformar(alunos[i:i + 10], exigir_mbti=False) for i in range(0, len(alunos), 10)]
+
+    assert len(completo["fato_perfil"]) == 35
+    for tabela in ["fato_perfil", "fato_historico"]:
+        pd.testing.assert_frame_equal(_juntar(lotes, tabela), _juntar([completo], tabela))
+
+
+def test_shards_com_shard_sem_mbti():
+    alunos = _alunos()
+    dfs = flatten_data(alunos)
+    completo = transformar_dados(*[dfs[t] for t in TABELAS_BRUTAS])
+
+    # Tantos shards quanto alunos: os sem questionários ficam sozinhos no seu shard
+    fatos = transformar_em_shards(dfs, n_shards=len(alunos), max_workers=2)
+    for tabela in ["fato_perfil", "fato_historico"]:
+        pd.testing.assert_frame_equal(fatos[tabela], _juntar([completo], tabela))
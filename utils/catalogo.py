@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+# ============================================================
+# 🔹 Catálogo de cursos compilado em arrays NumPy
+#    (usado pelos serviços de predição para pontuar todos os
+#     cursos de todos os alunos com operações vetoriais)
+# ============================================================
+COURSES_PATH = Path("data/courses.json")
+
+TOP_K = 10
+
+
+def carregar_cursos(caminho=COURSES_PATH):
+    """
+    Lê a lista de cursos ({"nome", "area"}) do JSON do catálogo.
+    """
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compilar_catalogo(cursos, area_index_map):
+    """
+    Pré-processa o catálogo uma única vez:
+
+    - areas: áreas distintas, na ordem das colunas por área;
+    - codigo: para cada curso, a posição da sua área em areas;
+    - indice_prob: para cada área, a coluna de predict_proba usada
+      como score base (pela parte antes de "/" do nome da área).
+
+    Os scores são calculados por área (poucas colunas) e expandidos
+    para os cursos com codigo, então o custo por aluno quase não
+    depende do tamanho do catálogo.
+    """
+    areas = sorted({curso["area"] for curso in cursos})
+    posicao = {area: i for i, area in enumerate(areas)}
+    return {
+        "nomes": [curso["nome"] for curso in cursos],
+        "areas_curso": [curso["area"] for curso in cursos],
+        "areas": areas,
+        "codigo": np.array([posicao[curso["area"]] for curso in cursos], dtype=np.intp),
+        "indice_prob": np.array([area_index_map.get(area.split("/")[0], 0) for area in areas], dtype=np.intp),
+    }
+
+
+def probs_por_area(catalogo, probs):
+    """
+    Score base (alunos × áreas): a probabilidade da classe de cada área.
+    """
+    return probs[:, np.minimum(catalogo["indice_prob"], probs.shape[1] - 1)]
+
+
+def colunas_por_area(catalogo, valores, padrao):
+    """
+    Empilha os vetores por aluno de cada área (alunos × áreas); áreas
+    ausentes de valores recebem padrao.
+    """
+    if not catalogo["areas"]:
+        return np.empty((len(padrao), 0))
+    return np.column_stack([valores.get(area, padrao) for area in catalogo["areas"]])
+
+
+def expandir_cursos(catalogo, por_area):
+    """
+    Converte uma matriz alunos × áreas em alunos × cursos.
+    """
+    return por_area[:, catalogo["codigo"]]
+
+
+def top_k(scores, k=TOP_K):
+    """
+    Índices dos k maiores scores de cada linha, do maior para o menor,
+    com empates na ordem do catálogo (o mesmo resultado de uma ordenação
+    estável). Usa argpartition e algumas passadas lineares: O(cursos)
+    por aluno em vez de ordenar o catálogo inteiro.
+    """
+    n_alunos, n_cursos = scores.shape
+    if k >= n_cursos:
+        return np.argsort(-scores, axis=1, kind="stable")
+
+    # 🔹 Valor de corte: o k-ésimo maior score de cada aluno
+    candidatos = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    corte = np.take_along_axis(scores, candidatos, axis=1).min(axis=1, keepdims=True)
+
+    # 🔹 Entram todos acima do corte e, entre os empatados no corte, os primeiros do catálogo
+    acima = scores > corte
+    empatados = scores == corte
+    vagas = k - acima.sum(axis=1, keepdims=True)
+    escolhidos = acima | (empatados & (np.cumsum(empatados, axis=1) <= vagas))
+
+    indices = np.nonzero(escolhidos)[1].reshape(n_alunos, k)
+    valores = np.take_along_axis(scores, indices, axis=1)
+    ordem = np.lexsort((indices, -valores), axis=1)
+    return np.take_along_axis(indices, ordem, axis=1)
+
+
+def cursos_recomendados(catalogo, scores, top):
+    """
+    Monta, para cada aluno, a lista [{"nome", "area", "score"}] dos cursos em top.
+    """
+    nomes, areas = catalogo["nomes"], catalogo["areas_curso"]
+    return [
+        [{"nome": nomes[j], "area": areas[j], "score": float(linha[j])} for j in indices]
+        for linha, indices in zip(scores, top)
+    ]
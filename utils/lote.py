@@ -0,0 +1,58 @@
+import json
+import traceback
+from functools import lru_cache
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+
+# ============================================================
+# 🔹 Predição em lote dos serviços (array JSON ou NDJSON)
+#    (POST /predict/batch do predict_service e do predict_service_v2)
+# ============================================================
+
+
+@lru_cache(maxsize=None)
+def _adaptador(schema):
+    return TypeAdapter(list[schema])
+
+
+def ler_lote(corpo, schema, content_type=""):
+    """
+    Converte o corpo de /predict/batch (array JSON ou NDJSON, um aluno
+    por linha) em uma lista de schema (o modelo pydantic do payload).
+    Retorna (registros, ndjson).
+    """
+    texto = corpo.decode("utf-8").strip()
+    ndjson = "ndjson" in content_type or not texto.startswith("[")
+    if ndjson:
+        registros = [schema.model_validate_json(linha) for linha in texto.splitlines() if linha.strip()]
+    else:
+        registros = _adaptador(schema).validate_json(texto)
+    return registros, ndjson
+
+
+async def responder_lote(request, schema, recomendar, ativo):
+    """
+    Corpo comum do /predict/batch: lê o lote, pontua com
+    recomendar(registros, ativo) numa thread (sem travar o event loop) e
+    responde no mesmo formato recebido, na mesma ordem.
+    """
+    try:
+        registros, ndjson = ler_lote(await request.body(), schema, request.headers.get("content-type", ""))
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    print(f"📦 Lote recebido: {len(registros)} alunos")
+
+    try:
+        resultados = await run_in_threadpool(recomendar, registros, ativo)
+    except Exception as e:
+        print("❌ Erro interno no modelo:", traceback.format_exc())
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if ndjson:
+        return StreamingResponse((json.dumps(r, ensure_ascii=False) + "\n" for r in resultados),
+                                 media_type="application/x-ndjson")
+    return JSONResponse(resultados)